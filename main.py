@@ -37,14 +37,16 @@ def signal_handler(signum, frame):
         exit(1)
     
     shutdown_requested = True
+    scheduler.request_shutdown()
     logger.warning('[⚠️] Graceful shutdown initiated. Press Ctrl+C again to force exit.')
     logger.info('[•] Waiting for current operations to complete...')
 
 
 async def aclose_session(browser: Browser, sol_wallet: SolWallet):
     try:
+        balance_feed.unregister(sol_wallet)
         await browser.session.close()
-        await sol_wallet.client.close()
+        await rpc_pool.release(sol_wallet.client)
 
     except Exception as err:
         logger.error(f'[-] Soft | {sol_wallet.address} | FAILED TO CLOSE SESSIONS: {err}')
@@ -104,8 +106,8 @@ async def run_module(mode: int, module_data: dict, sem: asyncio.Semaphore):
                             await TgReport().send_log(logs=reports)
 
                     if module_data["module_info"]["status"] is True:
-                        await async_sleep(randint(*settings.SLEEP_AFTER_ACC))
-                    else: await async_sleep(10)
+                        await async_sleep(settings.SLEEP_AFTER_ACC[0], jitter=settings.SLEEP_AFTER_ACC[1] - settings.SLEEP_AFTER_ACC[0], interruptible=True)
+                    else: await async_sleep(10, interruptible=True)
 
 
 async def runner(mode: int):
@@ -139,6 +141,14 @@ async def runner(mode: int):
             for module_data in all_modules
         ])
 
+    # дописываем оставшуюся статистику и выгружаем ее в Excel
+    await stats_store.flush()
+    # досылаем уведомления из очереди и закрываем сессию Telegram
+    await tg_notifier.close()
+    await fee_oracle.close()
+    await blockhash_cache.close()
+    await connection_pool.close()
+
     logger.success(f'All accounts done.')
     return 'Ended'
 
@@ -163,6 +173,10 @@ if __name__ == '__main__':
                 case "database":
                     db.create_modules()
 
+                case "onboarding":
+                    db.reset_onboarding()
+                    logger.success(f'[+] Soft | Onboarding state reset, all steps will be re-checked on next start\n')
+
                 case "module":
                     if asyncio.run(runner(mode=mode.soft_id)) == 'Ended': break
                     print('')
@@ -177,4 +191,5 @@ if __name__ == '__main__':
         logger.error(f'[-] Database | {err}')
 
     finally:
+        persistence.flush_sync(timeout=10)
         logger.info('[•] Soft | Closed')
@@ -1,9 +1,17 @@
 # tools
-from .utils import WindowName, TgReport, async_sleep, send_warning_notification
+from .utils import WindowName, TgReport, tg_notifier, scheduler, async_sleep, send_warning_notification
 from .sol_wallet import SolWallet
 from .database import DataBase
 from .browser import Browser
+from .price_feed import price_feed
+from .balance_feed import balance_feed
+from .stats_store import stats_store
+from .persistence import persistence
 from .config import address_locks
+from .connection_pool import connection_pool
+from .rpc_pool import rpc_pool
+from .fee_oracle import fee_oracle
+from .blockhash_cache import blockhash_cache
 
 # modules
 from .ranger import Ranger
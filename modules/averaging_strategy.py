@@ -29,11 +29,13 @@ from decimal import Decimal
 from loguru import logger
 from datetime import datetime
 import asyncio
-import os
 import time
 
-from .utils import round_cut, async_sleep, send_warning_notification, send_profit_notification
+from .utils import round_cut, async_sleep, scheduler, send_warning_notification, send_profit_notification
 from .utils.tg_report import TgReport
+from .balance_feed import balance_feed
+from .price_feed import price_feed
+from .stats_store import stats_store
 from .spot_client import SpotClient
 import settings
 
@@ -266,7 +268,30 @@ async def verify_order_exists_on_chain(client: 'SpotClient', order_id: str) -> b
         return True
 
 
-async def get_tp_orders_from_exchange(client: 'SpotClient', token_name: str) -> list:
+class OrderSnapshot:
+    """
+    Снимок лимитных ордеров аккаунта на одну итерацию стратегии.
+
+    `/api/v1/orders/limit` запрашивается один раз, и этот же список используют
+    поиск открытых TP, проверка исполненных ордеров, стоимость и список лимиток.
+    Сбрасывается явно через invalidate() - только после размещения своего ордера.
+    """
+
+    def __init__(self, client: 'SpotClient'):
+        self.client = client
+        self._orders = None
+
+    async def get_orders(self) -> list:
+        if self._orders is None:
+            self._orders = await self.client.browser.get_open_limit_orders()
+        return self._orders
+
+    def invalidate(self):
+        self._orders = None
+
+
+async def get_tp_orders_from_exchange(client: 'SpotClient', token_name: str,
+                                      snapshot: OrderSnapshot = None) -> list:
     """
     Получает список открытых TP ордеров с биржи (фильтрация по status == 0).
     
@@ -277,6 +302,7 @@ async def get_tp_orders_from_exchange(client: 'SpotClient', token_name: str) ->
     Args:
         client: SpotClient instance
         token_name: Название токена (например "WBTC")
+        snapshot: Снимок ордеров текущей итерации (None - запросить с биржи)
         
     Returns:
         list: Список TP ордеров [{order_id, amount, tp_price, entry_price, timestamp}, ...]
@@ -285,7 +311,10 @@ async def get_tp_orders_from_exchange(client: 'SpotClient', token_name: str) ->
     
     try:
         # Получаем открытые лимитные ордера с биржи
-        exchange_orders = await client.browser.get_open_limit_orders()
+        if snapshot is not None:
+            exchange_orders = await snapshot.get_orders()
+        else:
+            exchange_orders = await client.browser.get_open_limit_orders()
         
         if not exchange_orders:
             return tp_orders
@@ -470,7 +499,7 @@ async def get_tp_orders_from_exchange(client: 'SpotClient', token_name: str) ->
 
 
 async def check_executed_limit_orders(client: 'SpotClient', token_name: str, 
-                                      current_tp_orders: list) -> list:
+                                      current_tp_orders: list, snapshot: OrderSnapshot = None) -> list:
     """
     Проверяет какие лимитные ордера исполнились на бирже.
     
@@ -485,6 +514,7 @@ async def check_executed_limit_orders(client: 'SpotClient', token_name: str,
         client: SpotClient instance
         token_name: Название токена
         current_tp_orders: Текущий список открытых TP ордеров (status == 0)
+        snapshot: Снимок ордеров текущей итерации (None - запросить с биржи)
         
     Returns:
         list: Список НОВЫХ исполненных ордеров
@@ -498,7 +528,10 @@ async def check_executed_limit_orders(client: 'SpotClient', token_name: str,
             client._orders_cache_initialized = False
         
         # Получаем ВСЕ лимитные ордера (открытые + исполненные)
-        all_orders = await client.browser.get_open_limit_orders()
+        if snapshot is not None:
+            all_orders = await snapshot.get_orders()
+        else:
+            all_orders = await client.browser.get_open_limit_orders()
         
         if not all_orders:
             return []
@@ -673,8 +706,8 @@ async def log_statistics_to_excel(client: SpotClient, operation: str, token_amou
                                   token_balance: float, limit_orders_value: float, 
                                   limit_orders_list: str, total_value: float):
     """
-    Записывает статистику операции в отдельный Excel файл для каждого аккаунта.
-    Формат файла: stat/{account_label}_stat.xlsx
+    Записывает статистику операции в отдельный файл для каждого аккаунта.
+    Формат файла: stat/{account_label}_stat.csv (append-only), выгрузка в stat/{account_label}_stat.xlsx
     
     Args:
         current_market_price: Текущая рыночная цена на момент операции (bid/ask)
@@ -684,8 +717,6 @@ async def log_statistics_to_excel(client: SpotClient, operation: str, token_amou
         return
     
     try:
-        import pandas as pd
-        
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         # Подготавливаем данные для записи (с меткой аккаунта)
@@ -703,30 +734,8 @@ async def log_statistics_to_excel(client: SpotClient, operation: str, token_amou
             'Limit Orders List': limit_orders_list
         }
         
-        # Создаем каталог stat, если его нет
-        stats_dir = "stat"
-        if not os.path.exists(stats_dir):
-            os.makedirs(stats_dir)
-        
-        # Путь к файлу статистики (отдельный файл для каждого аккаунта)
-        stats_file = os.path.join(stats_dir, f"{client.sol_wallet.label}_stat.xlsx")
-        
-        # Проверяем, существует ли файл
-        if os.path.exists(stats_file):
-            df = pd.read_excel(stats_file)
-        else:
-            df = pd.DataFrame(columns=[
-                'Timestamp', 'Account', 'Current Price', 'Operation', 'Token Amount',
-                'Operation Price', 'USDC Balance', 'Token Balance', 'Limit Orders', 
-                'Total Value', 'Limit Orders List'
-            ])
-        
-        # Добавляем новую строку
-        new_df = pd.DataFrame([new_row])
-        df = pd.concat([df, new_df], ignore_index=True)
-        
-        # Сохраняем в Excel файл
-        df.to_excel(stats_file, index=False)
+        # Строка дописывается в stat/{label}_stat.csv фоновым writer-ом, xlsx выгружается периодически
+        stats_store.record(client.sol_wallet.label, new_row)
         
         client.log_message(
             f"📊 Statistics logged: {operation} | {token_amount:.6f} @ ${price:.2f}",
@@ -789,6 +798,37 @@ async def calculate_real_profit(client: SpotClient, sold_amount: float, sell_pri
         return 0.0
 
 
+async def wait_for_strategy_event(client: SpotClient, token_name: str, current_tp_orders: list):
+    """
+    Event-driven ожидание следующей итерации стратегии.
+    
+    Уровни по текущей лестнице TP регистрируются в общем price feed:
+    - вниз: min_tp_price - STEP * 2 (усреднение)
+    - вверх: min(min_tp_price, max_tp_price - PWR) (исполнение TP / пирамидинг)
+    Аккаунт спит до пересечения уровня, изменения баланса кошелька, STRATEGY_RECONCILE_INTERVAL
+    секунд (полная сверка) или завершения работы.
+    Свои транзакции кошелька будят сразу (balance_feed.invalidate). Исполнение TP кипером
+    видно сразу только при BALANCE_STREAMING, иначе - по уровню цены или на полной сверке.
+    """
+    tp_prices = [float(tp['tp_price']) for tp in current_tp_orders]
+    below = min(tp_prices) - settings.STEP * 2
+    above = min(min(tp_prices), max(tp_prices) - settings.STEP * settings.AGGR)
+
+    price_event = price_feed.add_trigger(token_name, below=below, above=above)
+    wallet_event = balance_feed.get_wallet_event(client.sol_wallet)
+    waiters = [
+        asyncio.create_task(price_event.wait()),
+        asyncio.create_task(wallet_event.wait()),
+        asyncio.create_task(scheduler.sleep(settings.STRATEGY_RECONCILE_INTERVAL)),  # прерывается и при завершении работы
+    ]
+    try:
+        await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        price_feed.remove_trigger(token_name, price_event)
+        for waiter in waiters:
+            waiter.cancel()
+
+
 async def trade_averaging_strategy(client: SpotClient, token_name: str):
     """
     Основная функция стратегии усреднения/пирамидинга
@@ -826,21 +866,20 @@ async def trade_averaging_strategy(client: SpotClient, token_name: str):
         last_heartbeat_time = 0  # Время последнего heartbeat
         
         while True:
-            # Проверка флага graceful shutdown
-            try:
-                import main
-                if hasattr(main, 'shutdown_requested') and main.shutdown_requested:
-                    client.log_message(
-                        f"🛑 {client.sol_wallet.label}: Graceful shutdown requested. Stopping strategy...",
-                        level="WARNING"
-                    )
-                    return True
-            except:
-                pass  # Если не удалось импортировать - продолжаем
+            # Проверка флага graceful shutdown (выставляется обработчиком сигнала в main)
+            if scheduler.shutdown_requested:
+                client.log_message(
+                    f"🛑 {client.sol_wallet.label}: Graceful shutdown requested. Stopping strategy...",
+                    level="WARNING"
+                )
+                return True
             
             try:
+                # Один снимок лимитных ордеров на всю итерацию
+                snapshot = OrderSnapshot(client)
+                
                 # Получаем текущие TP ордера с биржи (источник истины!)
-                current_tp_orders = await get_tp_orders_from_exchange(client, token_name)
+                current_tp_orders = await get_tp_orders_from_exchange(client, token_name, snapshot)
                 
                 # Рассчитываем стоимость лимитных ордеров (один раз для всей итерации)
                 limit_orders_value = calculate_limit_orders_value(current_tp_orders)
@@ -889,7 +928,7 @@ async def trade_averaging_strategy(client: SpotClient, token_name: str):
                 # Проверяем исполненные лимитные ордера (сравнение состояний)
                 # НЕ проверяем при первом запуске (iteration_count == 0), чтобы избежать дублирования старых сообщений
                 if iteration_count > 0:
-                    executed_orders = await check_executed_limit_orders(client, token_name, current_tp_orders)
+                    executed_orders = await check_executed_limit_orders(client, token_name, current_tp_orders, snapshot)
                 else:
                     executed_orders = []
                 
@@ -912,12 +951,11 @@ async def trade_averaging_strategy(client: SpotClient, token_name: str):
                         # 📊 ОБНОВЛЯЕМ БАЛАНСЫ ПЕРЕД записью текущего TP
                         # Для старых TP (при запуске) балансы могут быть одинаковые из-за кэша API
                         # Для новых TP (в реальном времени) балансы будут актуальные
+                        balance_feed.invalidate(client.sol_wallet)
                         usdc_balance = await client.get_usdc_balance()
                         token_balance = await client.get_token_balance(token_name)
-                        # Пересчитываем limit_orders после исполнения TP
-                        current_tp_orders = await get_tp_orders_from_exchange(client, token_name)
-                        limit_orders_value = calculate_limit_orders_value(current_tp_orders)
-                        limit_orders_list = format_limit_orders_list(current_tp_orders)
+                        # limit_orders не пересчитываем: снимок, из которого взяли исполненный TP,
+                        # уже не содержит его в открытых ордерах
                         total_value = float(usdc_balance) + (float(token_balance) * float(current_price)) + limit_orders_value
                         
                         # Логируем прибыль
@@ -1084,8 +1122,9 @@ async def trade_averaging_strategy(client: SpotClient, token_name: str):
                             # Получаем актуальный баланс после создания TP (может измениться из-за комиссий)
                             usdc_balance = await client.get_usdc_balance()
                             token_balance = await client.get_token_balance(token_name)
-                            # После создания нового TP ордера, пересчитываем список TP ордеров
-                            current_tp_orders = await get_tp_orders_from_exchange(client, token_name)
+                            # После создания нового TP ордера снимок устарел - запрашиваем заново
+                            snapshot.invalidate()
+                            current_tp_orders = await get_tp_orders_from_exchange(client, token_name, snapshot)
                             limit_orders_value = calculate_limit_orders_value(current_tp_orders)
                             limit_orders_list = format_limit_orders_list(current_tp_orders)
                             total_value = float(usdc_balance) + (float(token_balance) * float(current_price)) + limit_orders_value
@@ -1224,8 +1263,9 @@ async def trade_averaging_strategy(client: SpotClient, token_name: str):
                             # Получаем актуальный баланс после создания TP
                             usdc_balance = await client.get_usdc_balance()
                             token_balance = await client.get_token_balance(token_name)
-                            # После создания нового TP ордера, пересчитываем список TP ордеров
-                            current_tp_orders = await get_tp_orders_from_exchange(client, token_name)
+                            # После создания нового TP ордера снимок устарел - запрашиваем заново
+                            snapshot.invalidate()
+                            current_tp_orders = await get_tp_orders_from_exchange(client, token_name, snapshot)
                             limit_orders_value = calculate_limit_orders_value(current_tp_orders)
                             limit_orders_list = format_limit_orders_list(current_tp_orders)
                             total_value = float(usdc_balance) + (float(token_balance) * float(current_price)) + limit_orders_value
@@ -1364,8 +1404,9 @@ async def trade_averaging_strategy(client: SpotClient, token_name: str):
                             # Получаем актуальный баланс после создания TP
                             usdc_balance = await client.get_usdc_balance()
                             token_balance = await client.get_token_balance(token_name)
-                            # После создания нового TP ордера, пересчитываем список TP ордеров
-                            current_tp_orders = await get_tp_orders_from_exchange(client, token_name)
+                            # После создания нового TP ордера снимок устарел - запрашиваем заново
+                            snapshot.invalidate()
+                            current_tp_orders = await get_tp_orders_from_exchange(client, token_name, snapshot)
                             limit_orders_value = calculate_limit_orders_value(current_tp_orders)
                             limit_orders_list = format_limit_orders_list(current_tp_orders)
                             total_value = float(usdc_balance) + (float(token_balance) * float(current_price)) + limit_orders_value
@@ -1431,7 +1472,10 @@ async def trade_averaging_strategy(client: SpotClient, token_name: str):
                 iteration_count += 1
                 
                 # Ждем перед следующей итерацией
-                await async_sleep(10)
+                if settings.STRATEGY_EVENT_DRIVEN and current_tp_orders:
+                    await wait_for_strategy_event(client, token_name, current_tp_orders)
+                else:
+                    await async_sleep(10, interruptible=True)
                 
             except Exception as e:
                 client.log_message(f"❌ {client.sol_wallet.label}: Trading error: {e}", level="ERROR")
@@ -0,0 +1,224 @@
+"""
+Общий агрегатор балансов кошельков
+==================================
+
+Раньше каждый аккаунт на каждом тике делал отдельный get_token_account_balance
+на каждый токен (USDC, актив + повторы в calculate_position_size) - при 100 аккаунтах
+это ~300 RPC запросов за тик.
+
+BalanceFeed знает ATA всех зарегистрированных кошельков и получает их пачками
+через getMultipleAccounts (до 100 аккаунтов за запрос), а баланс SPL токена
+декодирует локально из данных аккаунта. Результат кэшируется на BALANCE_MAX_AGE секунд.
+
+С BALANCE_STREAMING балансы дополнительно обновляются пушами через WebSocket
+(см. balance_stream.py) и HTTP нужен только для первичной загрузки и фоллбэка.
+"""
+
+from solana.rpc.commitment import Confirmed
+from solders.pubkey import Pubkey
+from loguru import logger
+from time import time
+import asyncio
+
+from modules.balance_stream import BalanceStream
+from modules.config import SOL_TOKEN_ADDRESSES
+import settings
+
+
+ACCOUNTS_CHUNK = 100            # лимит getMultipleAccounts на один запрос
+
+
+class BalanceFeed:
+    def __init__(self, max_age: float, stream: BalanceStream = None):
+        self.max_age = max_age
+        self.stream = stream
+        if self.stream is not None:
+            self.stream.feed = self
+
+        self.wallets = {}               # address -> SolWallet
+        self.tokens = {}                # address -> {token, ...}
+        self.accounts = {}              # (address, token) -> Pubkey аккаунта с балансом
+        self.balances = {}              # (address, token) -> {"amount", "value", "decimals", "timestamp", "streamed"}
+        self.decimals = {SOL_TOKEN_ADDRESSES["SOL"]: 9}
+
+        self.lock = asyncio.Lock()
+        self._updated = asyncio.Event()
+        self._wallet_updated = {}       # address -> Event следующего пуша по кошельку
+
+
+    def register(self, sol_wallet, tokens: list):
+        address = str(sol_wallet.address)
+        self.wallets[address] = sol_wallet
+
+        for token in tokens:
+            mint = SOL_TOKEN_ADDRESSES.get(token, token)
+            if (address, mint) in self.accounts:
+                continue
+
+            self.tokens.setdefault(address, set()).add(mint)
+            self.accounts[(address, mint)] = self._get_account(address, mint)
+            if self.stream is not None:
+                self.stream.watch((address, mint), self.accounts[(address, mint)])
+
+
+    def unregister(self, sol_wallet):
+        address = str(sol_wallet.address)
+        self.invalidate(sol_wallet)
+        for key in [key for key in self.accounts if key[0] == address]:
+            if self.stream is not None:
+                self.stream.unwatch(self.accounts[key])
+            del self.accounts[key]
+        self.wallets.pop(address, None)
+        self.tokens.pop(address, None)
+
+
+    def invalidate(self, sol_wallet):
+        """Сбрасывает кэш кошелька (после своих транзакций и исполнения ордеров) и будит его ожидающих"""
+        address = str(sol_wallet.address)
+        for key in [key for key in self.balances if key[0] == address]:
+            del self.balances[key]
+        if address in self._wallet_updated:
+            self._wallet_updated.pop(address).set()
+
+
+    def get_cached(self, address: str, mint: str):
+        balance = self.balances.get((address, mint))
+        if not balance:
+            return None
+
+        # пока подписка жива - нода сама пришлет изменение, кэш не стареет
+        if balance["streamed"] and self.stream.is_subscribed(self.accounts[(address, mint)]):
+            return balance
+        if time() - balance["timestamp"] <= self.max_age:
+            return balance
+        return None
+
+
+    def update(self, key: tuple, account):
+        """Новое значение аккаунта из WebSocket подписки"""
+        if key[1] not in self.decimals:
+            return
+
+        self._store(key, self._decode_balance(key[1], account), streamed=True)
+        self._updated.set()
+        self._updated = asyncio.Event()
+        if key[0] in self._wallet_updated:
+            self._wallet_updated.pop(key[0]).set()
+
+
+    async def wait_for_update(self, timeout: float):
+        """Ждет следующий пуш баланса из стрима (или просто timeout без стрима)"""
+        try:
+            await asyncio.wait_for(self._updated.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+    def get_wallet_event(self, sol_wallet) -> asyncio.Event:
+        """
+        Событие следующего изменения баланса кошелька: пуш стрима (исполнение ордера, перевод -
+        только при BALANCE_STREAMING) или invalidate после своей транзакции
+        """
+        return self._wallet_updated.setdefault(str(sol_wallet.address), asyncio.Event())
+
+
+    def is_streaming(self, sol_wallet, token: str) -> bool:
+        key = (str(sol_wallet.address), SOL_TOKEN_ADDRESSES.get(token, token))
+        return self.stream is not None and key in self.accounts and self.stream.is_subscribed(self.accounts[key])
+
+
+    async def get_token_info(self, sol_wallet, token: str):
+        """
+        Баланс токена кошелька в формате SolWallet.get_token_info: amount, value, decimals.
+        Если кэш устарел - одним проходом обновляются все устаревшие балансы всех кошельков.
+        """
+        address = str(sol_wallet.address)
+        mint = SOL_TOKEN_ADDRESSES.get(token, token)
+        self.register(sol_wallet, [mint])
+
+        balance = self.get_cached(address, mint)
+        if balance is not None:
+            return balance
+
+        async with self.lock:
+            balance = self.get_cached(address, mint)
+            if balance is None:
+                await self.refresh(client=sol_wallet.client)
+                balance = self.get_cached(address, mint)
+
+        if balance is None:
+            raise Exception(f'Failed to fetch {token} balance')
+        return balance
+
+
+    async def refresh(self, client):
+        stale = [
+            (address, mint)
+            for address, mints in self.tokens.items()
+            for mint in mints
+            if self.get_cached(address, mint) is None
+        ]
+        if not stale:
+            return
+
+        await self._load_decimals(client, {mint for _, mint in stale})
+
+        pubkeys = [self.accounts[key] for key in stale]
+        for index in range(0, len(pubkeys), ACCOUNTS_CHUNK):
+            chunk = pubkeys[index:index + ACCOUNTS_CHUNK]
+            # commitment как у пушей стрима; ответ HTTP стареет через max_age даже при живой подписке
+            accounts = (await client.get_multiple_accounts(chunk, commitment=Confirmed)).value
+
+            for key, account in zip(stale[index:index + ACCOUNTS_CHUNK], accounts):
+                self._store(key, self._decode_balance(key[1], account), streamed=False)
+
+        logger.debug(f'[•] BalanceFeed | Updated {len(stale)} balances in {(len(pubkeys) - 1) // ACCOUNTS_CHUNK + 1} requests')
+
+
+    def _store(self, key: tuple, value: int, streamed: bool):
+        decimals = self.decimals[key[1]]
+        self.balances[key] = {
+            "amount": value / 10 ** decimals,
+            "value": value,
+            "decimals": decimals,
+            "timestamp": time(),
+            "streamed": streamed,
+        }
+
+
+    async def _load_decimals(self, client, mints: set):
+        """Decimals берутся из аккаунтов минтов один раз (u8 по смещению 44)"""
+        missing = [mint for mint in mints if mint not in self.decimals]
+        if not missing:
+            return
+
+        for index in range(0, len(missing), ACCOUNTS_CHUNK):
+            chunk = missing[index:index + ACCOUNTS_CHUNK]
+            accounts = (await client.get_multiple_accounts([Pubkey.from_string(mint) for mint in chunk], commitment=Confirmed)).value
+            for mint, account in zip(chunk, accounts):
+                if account is None:
+                    raise Exception(f'Mint {mint} not found')
+                self.decimals[mint] = account.data[44]
+
+
+    def _get_account(self, address: str, mint: str):
+        sol_wallet = self.wallets[address]
+        if mint == SOL_TOKEN_ADDRESSES["SOL"]:
+            return sol_wallet.address
+        return sol_wallet.get_associated_token(token=mint, address=sol_wallet.address)
+
+
+    @classmethod
+    def _decode_balance(cls, mint: str, account):
+        if account is None:
+            return 0
+        if mint == SOL_TOKEN_ADDRESSES["SOL"]:
+            return account.lamports
+        # SPL token account: mint (32) | owner (32) | amount (u64 LE) | ...
+        return int.from_bytes(bytes(account.data[64:72]), "little")
+
+
+balance_feed = BalanceFeed(
+    max_age=settings.BALANCE_MAX_AGE,
+    stream=BalanceStream(ws_endpoint=settings.RPCS["solana_ws"]) if settings.BALANCE_STREAMING else None,
+)
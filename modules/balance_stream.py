@@ -0,0 +1,101 @@
+"""
+Стриминг балансов через WebSocket (accountSubscribe)
+====================================================
+
+Опциональный режим для BalanceFeed (settings.BALANCE_STREAMING): на каждый ATA
+зарегистрированных кошельков оформляется accountSubscribe, и нода сама присылает
+новый баланс как только аккаунт изменился. Пока подписка жива, баланс из кэша
+считается актуальным без HTTP запросов.
+
+При обрыве соединения подписки пропадают, балансы стареют и BalanceFeed
+автоматически возвращается к HTTP (getMultipleAccounts), а стрим переподключается
+и переоформляет все подписки.
+"""
+
+from solders.rpc.responses import AccountNotification, SubscriptionResult
+from solana.rpc.websocket_api import connect
+from solana.rpc.commitment import Confirmed
+from loguru import logger
+import asyncio
+
+
+class BalanceStream:
+    def __init__(self, ws_endpoint: str, reconnect_delay: float = 5):
+        self.ws_endpoint = ws_endpoint
+        self.reconnect_delay = reconnect_delay
+        self.feed = None                # BalanceFeed, выставляется в BalanceFeed.__init__
+
+        self.accounts = {}              # str(pubkey) -> (address, mint)
+        self.pubkeys = {}               # str(pubkey) -> Pubkey
+        self.pending = {}               # request id -> str(pubkey)
+        self.subscriptions = {}         # subscription id -> str(pubkey)
+        self.subscribed = set()         # str(pubkey) с подтвержденной подпиской
+
+        self.connected = False
+        self._task = None
+
+
+    def watch(self, key: tuple, pubkey):
+        """Добавляет аккаунт (address, mint) в подписки; подписка оформится в фоне"""
+        self.accounts[str(pubkey)] = key
+        self.pubkeys[str(pubkey)] = pubkey
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+
+    def unwatch(self, pubkey):
+        # подписку на сервере не снимаем - уведомления по неизвестному аккаунту просто игнорируются
+        self.accounts.pop(str(pubkey), None)
+        self.pubkeys.pop(str(pubkey), None)
+        self.subscribed.discard(str(pubkey))
+
+
+    def is_subscribed(self, pubkey) -> bool:
+        return self.connected and str(pubkey) in self.subscribed
+
+
+    async def _run(self):
+        while self.accounts:
+            try:
+                async with connect(self.ws_endpoint) as websocket:
+                    self.connected = True
+                    logger.debug(f'[•] BalanceStream | Connected to {self.ws_endpoint}')
+                    await self._listen(websocket)
+
+            except Exception as err:
+                logger.warning(f'[-] BalanceStream | Connection lost, fallback to HTTP: {err}')
+
+            finally:
+                self.connected = False
+                self.pending.clear()
+                self.subscriptions.clear()
+                self.subscribed.clear()
+
+            await asyncio.sleep(self.reconnect_delay)
+
+
+    async def _listen(self, websocket):
+        while self.accounts:
+            # новые кошельки могут появиться в любой момент - подписываем их между чтениями
+            for account, pubkey in list(self.pubkeys.items()):
+                if account not in self.subscribed and account not in self.pending.values():
+                    await websocket.account_subscribe(pubkey, commitment=Confirmed, encoding="base64")
+                    # request_counter - itertools.count, id отправленного запроса - последний ключ sent_subscriptions
+                    self.pending[max(websocket.sent_subscriptions)] = account
+
+            try:
+                messages = await asyncio.wait_for(websocket.recv(), timeout=1)
+            except asyncio.TimeoutError:
+                continue
+
+            for message in messages:
+                if isinstance(message, SubscriptionResult):
+                    account = self.pending.pop(message.id, None)
+                    if account:
+                        self.subscriptions[message.result] = account
+                        self.subscribed.add(account)
+
+                elif isinstance(message, AccountNotification):
+                    account = self.subscriptions.get(message.subscription)
+                    if account in self.accounts:
+                        self.feed.update(self.accounts[account], message.result.value)
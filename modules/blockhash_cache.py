@@ -0,0 +1,79 @@
+"""
+Общий кэш последнего blockhash
+==============================
+
+send_transaction запрашивал get_latest_blockhash прямо перед подписью каждой
+транзакции - лишний RPC запрос на критическом пути.
+
+BlockhashCache обновляет blockhash в фоне раз в BLOCKHASH_REFRESH_INTERVAL секунд
+и отдает последнее значение (blockhash + last_valid_block_height) всем кошелькам.
+Запросы идут через свой клиент из rpc_pool (клиенты кошельков закрываются вместе
+с аккаунтами), фоновое обновление останавливается при завершении работы; close() в конце.
+"""
+
+from solana.rpc.commitment import Confirmed
+from loguru import logger
+from time import time
+import asyncio
+
+from modules.utils.scheduler import scheduler
+from modules.rpc_pool import rpc_pool
+import settings
+
+
+class BlockhashCache:
+    def __init__(self, interval: float, max_age: float = 30):
+        self.interval = interval
+        self.max_age = max_age          # blockhash живет ~60-90 сек, старше max_age не отдаем
+
+        self.value = None               # RpcBlockhash: .blockhash, .last_valid_block_height
+        self.updated = 0
+        self.client = None              # свой AsyncClient из rpc_pool
+
+        self.lock = asyncio.Lock()
+        self._task = None
+
+
+    async def get(self):
+        """Последний blockhash; если кэш пуст или устарел - запрашивает сразу"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+        if self.value is None or time() - self.updated > self.max_age:
+            async with self.lock:
+                if self.value is None or time() - self.updated > self.max_age:
+                    await self.refresh()
+
+        return self.value
+
+
+    async def refresh(self):
+        self.value = (await self._get_client().get_latest_blockhash(Confirmed)).value
+        self.updated = time()
+
+
+    async def close(self):
+        """Освобождает клиент (в конце работы event loop-а)"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.client is not None:
+            await rpc_pool.release(self.client)
+            self.client = None
+
+
+    def _get_client(self):
+        if self.client is None:
+            self.client = rpc_pool.acquire(endpoints=settings.RPCS["solana"], proxy=None)
+        return self.client
+
+
+    async def _run(self):
+        while await scheduler.sleep(self.interval):
+            try:
+                await self.refresh()
+            except Exception as err:
+                logger.debug(f'[-] BlockhashCache | Refresh failed: {err}')
+
+
+blockhash_cache = BlockhashCache(interval=settings.BLOCKHASH_REFRESH_INTERVAL)
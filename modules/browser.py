@@ -1,9 +1,11 @@
 from aiohttp import ClientSession
 from loguru import logger
 from json import dumps
+from yarl import URL
 
 from modules.retry import async_retry, have_json
 from modules.database import DataBase
+from modules.connection_pool import connection_pool
 from .config import SOL_TOKEN_ADDRESSES
 
 
@@ -43,18 +45,34 @@ class Browser:
             "Origin" : "https://www.app.ranger.finance",
             "Referer": "https://www.app.ranger.finance/",
         })
+        self.privy_cookies = {}
 
 
     def get_new_session(self):
+        # коннектор общий для всех аккаунтов с этим прокси - сессия его не закрывает
         session = ClientSession(
             headers={
                 "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15"
             },
+            connector=connection_pool.get_connector(self.proxy),
+            connector_owner=False,
         )
         if self.proxy:
             session.proxy = self.proxy
         return session
 
+    def set_privy_token(self, token: str):
+        """
+        Кладет актуальный токен Privy в cookies сессии для www.app.ranger.finance
+        (онбординг, реферал, approve builder fee). Spot API на *.run.app токен не использует -
+        запросы стратегии идут по адресу кошелька, туда cookies не отправляем
+        """
+        self.privy_cookies = {
+            "privy-session": "t",
+            "privy-token": token,
+        }
+        self.session.cookie_jar.update_cookies(self.privy_cookies, response_url=URL("https://www.app.ranger.finance/"))
+
     @have_json
     async def send_request(self, **kwargs):
         timed_session = False
@@ -261,6 +279,7 @@ class Browser:
     async def initialize_ranger_account(self, user_id: str, privy_cookies: dict):
         """
         Инициализирует аккаунт Ranger Finance
+        Возвращает True если аккаунт успешно инициализирован
         """
         try:
             r = await self.send_request(
@@ -279,6 +298,7 @@ class Browser:
                 response = json.loads(text_response)
                 if response != {"is_success": True}:
                     raise Exception(f'Unexpected initialize ranger account response: {response}')
+                return True
             except json.JSONDecodeError as e:
                 logger.error(f"Initialize Ranger Account: Invalid JSON response (Status {r.status})")
                 raise Exception(f"Initialize Ranger Account returned invalid JSON")
@@ -286,7 +306,7 @@ class Browser:
         except Exception as e:
             # Аккаунт уже инициализирован или другая ошибка - продолжаем работу
             logger.warning(f"⚠️ Initialize Ranger Account failed, skipping (account might be already initialized)")
-            pass  # Не прерываем работу
+            return False  # Не прерываем работу
 
 
     @async_retry(source="Browser")
@@ -322,6 +342,7 @@ class Browser:
     async def use_ref_code(self, signature: str, user_id: str, privy_cookies: dict):
         """
         Применяет реферальный код для аккаунта
+        Возвращает True если код применен (или уже активен)
         """
         try:
             r = await self.send_request(
@@ -348,6 +369,7 @@ class Browser:
                         any([a["referred_status"] != "Active" for a in response])
                 ):
                     raise Exception(f'Use referral code unexpected response: {response}')
+                return True
             except json.JSONDecodeError as e:
                 logger.error(f"Use Ref Code: Invalid JSON response (Status {r.status})")
                 raise Exception(f"Use Ref Code returned invalid JSON")
@@ -355,7 +377,7 @@ class Browser:
         except Exception as e:
             # Реферальный код уже применен или другая ошибка - продолжаем работу
             logger.warning(f"⚠️ Use Ref Code failed, skipping (code might be already applied)")
-            pass  # Не прерываем работу
+            return False  # Не прерываем работу
 
 
     async def get_token_price(self, token_symbol: str):
@@ -385,36 +407,56 @@ class Browser:
         Возвращает только среднюю цену (без BID/ASK, т.к. API их не предоставляет).
         """
         try:
-            from .config import SOL_TOKEN_ADDRESSES
-            
+            prices = await self.get_multi_price([token_symbol])
+
+            price = prices.get(token_symbol)
+            if not price:
+                raise Exception('Token price not found in response')
+
+            return price
+
+        except Exception as e:
+            logger.debug(f"Failed to get price from Pricing API: {e}")
+            return None
+
+    async def get_multi_price(self, token_symbols: list):
+        """
+        Получает цены сразу нескольких токенов одним запросом к /defi/multi_price
+
+        Args:
+            token_symbols: Символы токенов из SOL_TOKEN_ADDRESSES (например ["WBTC", "USDC", "SOL"])
+
+        Returns:
+            dict: {symbol: price} - только токены с валидной (> 0) ценой
+        """
+        addresses = {}
+        for token_symbol in token_symbols:
             token_address = SOL_TOKEN_ADDRESSES.get(token_symbol)
             if not token_address:
                 raise Exception(f'Token {token_symbol} not found in SOL_TOKEN_ADDRESSES')
-            
-            r = await self.send_request(
-                method="GET",
-                url=f"https://prod-spot-pricing-api-437363704888.asia-northeast1.run.app/defi/multi_price",
-                params={"list_address": token_address}
-            )
-            response = await r.json()
-            
-            if not response.get('success') or not response.get('data'):
-                raise Exception('Invalid pricing API response')
-            
+            addresses[token_address] = token_symbol
+
+        r = await self.send_request(
+            method="GET",
+            url=f"https://prod-spot-pricing-api-437363704888.asia-northeast1.run.app/defi/multi_price",
+            params={"list_address": ",".join(addresses)}
+        )
+        response = await r.json()
+
+        if not response.get('success') or not response.get('data'):
+            raise Exception('Invalid pricing API response')
+
+        prices = {}
+        for token_address, token_symbol in addresses.items():
             token_data = response['data'].get(token_address)
             if not token_data or not token_data.get('value'):
-                raise Exception('Token price not found in response')
-            
+                continue
+
             price = float(token_data['value'])
-            
-            if price <= 0:
-                raise Exception('Price is zero or negative')
-            
-            return price
-            
-        except Exception as e:
-            logger.debug(f"Failed to get price from Pricing API: {e}")
-            return None
+            if price > 0:
+                prices[token_symbol] = price
+
+        return prices
     
     async def _get_price_from_ranger_quote(self, token_symbol: str):
         """
@@ -762,10 +804,11 @@ class Browser:
         """
         try:
             import settings
+            from modules.rpc_pool import get_endpoints
             
             r = await self.send_request(
                 method="POST",
-                url=settings.RPCS.get("solana", "https://api.mainnet-beta.solana.com"),
+                url=get_endpoints(settings.RPCS.get("solana", "https://api.mainnet-beta.solana.com"))[0],
                 json={
                     "jsonrpc": "2.0",
                     "id": 1,
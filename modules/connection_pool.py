@@ -0,0 +1,53 @@
+"""
+Общий пул HTTP соединений
+=========================
+
+Каждый Browser создавал свой ClientSession со своим коннектором, поэтому TLS
+соединение со spot API Ranger поднималось заново для каждого аккаунта,
+а send_request(new_session=True) еще и на каждый запрос.
+
+ConnectionPool раздает один TCPConnector на прокси (keep-alive, кэш DNS,
+лимит соединений на хост). Сессии Browser остаются отдельными (свои cookies),
+но используют общий коннектор и не закрывают его сами; коннекторы
+закрываются один раз в конце работы (close()).
+"""
+
+from aiohttp import TCPConnector
+
+import settings
+
+
+class ConnectionPool:
+    def __init__(self, limit_per_host: int, keepalive_timeout: float, dns_ttl: int):
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_ttl = dns_ttl
+
+        self.connectors = {}            # proxy (None - без прокси) -> TCPConnector
+
+
+    def get_connector(self, proxy: str | None) -> TCPConnector:
+        connector = self.connectors.get(proxy)
+        if connector is None or connector.closed:
+            connector = self.connectors[proxy] = TCPConnector(
+                limit=0,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_ttl,
+            )
+        return connector
+
+
+    async def close(self):
+        """Закрывает все коннекторы (в конце работы event loop-а)"""
+        for connector in self.connectors.values():
+            if not connector.closed:
+                await connector.close()
+        self.connectors.clear()
+
+
+connection_pool = ConnectionPool(
+    limit_per_host=settings.HTTP_LIMIT_PER_HOST,
+    keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+    dns_ttl=settings.HTTP_DNS_TTL,
+)
@@ -1,23 +1,80 @@
 from random import choice, randint, shuffle
 from cryptography.fernet import Fernet
 from base64 import urlsafe_b64encode
-from os import path, mkdir
+from os import path, mkdir, rename
+from threading import Lock
 from loguru import logger
 from hashlib import md5
 from time import sleep
+import sqlite3
 import asyncio
 import json
 
 from modules.utils import get_sol_address, WindowName
 from modules.retry import DataBaseError, CustomError
+from modules.persistence import persistence
 from settings import SHUFFLE_WALLETS
 
 from cryptography.fernet import InvalidToken
 
 
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    encoded_pk  TEXT PRIMARY KEY,
+    sol_address TEXT NOT NULL,
+    label       TEXT NOT NULL,
+    proxy       TEXT
+);
+CREATE TABLE IF NOT EXISTS modules (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    encoded_pk  TEXT NOT NULL,
+    module_name TEXT NOT NULL,
+    status      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS modules_account ON modules (encoded_pk, status);
+CREATE INDEX IF NOT EXISTS modules_status ON modules (status);
+
+CREATE TABLE IF NOT EXISTS reports (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    encoded_pk  TEXT NOT NULL,
+    text        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_account ON reports (encoded_pk);
+CREATE TABLE IF NOT EXISTS report_rates (
+    encoded_pk  TEXT PRIMARY KEY,
+    success     INTEGER NOT NULL DEFAULT 0,
+    total       INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS modules_done (
+    sol_address TEXT PRIMARY KEY,
+    done        INTEGER NOT NULL,
+    total       INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS onboarding (
+    sol_address TEXT NOT NULL,
+    step        TEXT NOT NULL,
+    PRIMARY KEY (sol_address, step)
+);
+
+CREATE TABLE IF NOT EXISTS privy_sessions (
+    sol_address TEXT PRIMARY KEY,
+    data        TEXT NOT NULL
+);
+"""
+
+
 class DataBase:
+    """
+    База данных софта в SQLite (WAL режим): модули, отчеты и статистика в индексированных таблицах.
+    Каждая запись - один короткий запрос вместо перечитывания и перезаписи целого JSON файла.
+    """
+
     def __init__(self):
 
+        self.db_name = 'databases/ranger.db'
+        # старые JSON базы - переносятся в SQLite один раз при первом запуске
         self.modules_db_name = 'databases/modules.json'
         self.report_db_name = 'databases/report.json'
         self.stats_db_name = 'databases/stats.json'
@@ -25,22 +82,117 @@ class DataBase:
         self.window_name = None
 
         self.lock = asyncio.Lock()
+        self.db_lock = Lock()
 
         # create db's if not exists
-        if not path.isdir(self.modules_db_name.split('/')[0]):
-            mkdir(self.modules_db_name.split('/')[0])
+        if not path.isdir(self.db_name.split('/')[0]):
+            mkdir(self.db_name.split('/')[0])
 
-        for db in [
-            {"name": self.modules_db_name, "default": "[]"},
-            {"name": self.report_db_name, "default": "{}"},
-            {"name": self.stats_db_name, "default": "{}"},
-        ]:
-            if not path.isfile(db["name"]):
-                with open(db["name"], 'w') as f: f.write(db["default"])
+        self.connection = sqlite3.connect(self.db_name, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+        self._migrate_from_json()
 
         amounts = self.get_amounts()
         logger.info(f'Loaded {amounts["modules_amount"]} modules for {amounts["accs_amount"]} accounts\n')
 
+    def _execute(self, *queries: tuple, fetch: str = None):
+        """
+        Выполняет запросы (sql, params) одной транзакцией.
+        fetch: None | "one" | "all" - что вернуть из результата последнего запроса
+        """
+        with self.db_lock:
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN")
+            try:
+                for sql, params in queries:
+                    cursor.execute(sql, params)
+                if fetch == "one": result = cursor.fetchone()
+                elif fetch == "all": result = cursor.fetchall()
+                else: result = None
+                cursor.execute("COMMIT")
+                return result
+            except:
+                cursor.execute("ROLLBACK")
+                raise
+
+    async def _aexecute(self, *queries: tuple, fetch: str = None):
+        """_execute в отдельном потоке - event loop не ждет диск"""
+        return await asyncio.to_thread(self._execute, *queries, fetch=fetch)
+
+    def _migrate_from_json(self):
+        """Одноразовый перенос modules.json / report.json / stats.json в SQLite"""
+        json_dbs = [self.modules_db_name, self.report_db_name, self.stats_db_name]
+        if not any(path.isfile(db_name) for db_name in json_dbs):
+            return
+
+        queries = []
+        if path.isfile(self.modules_db_name):
+            with open(self.modules_db_name, encoding="utf-8") as f: modules_db = json.load(f) or {}
+            queries += self._get_accounts_queries(modules_db)
+
+        if path.isfile(self.report_db_name):
+            with open(self.report_db_name, encoding="utf-8") as f: report_db = json.load(f) or {}
+            for encoded_pk, account_reports in report_db.items():
+                queries += [
+                    ("INSERT INTO reports (encoded_pk, text) VALUES (?, ?)", (encoded_pk, text))
+                    for text in account_reports["texts"]
+                ]
+                queries.append((
+                    "INSERT OR REPLACE INTO report_rates (encoded_pk, success, total) VALUES (?, ?, ?)",
+                    (encoded_pk, *account_reports["success_rate"])
+                ))
+
+        if path.isfile(self.stats_db_name):
+            with open(self.stats_db_name, encoding="utf-8") as f: stats_db = json.load(f) or {}
+            queries += [
+                ("INSERT OR REPLACE INTO modules_done (sol_address, done, total) VALUES (?, ?, ?)", (address, *modules_done))
+                for address, modules_done in stats_db.get("modules_done", {}).items()
+            ]
+
+        self._execute(*queries)
+        for db_name in json_dbs:
+            if path.isfile(db_name): rename(db_name, db_name + '.bak')
+        logger.success(f'[+] Soft | Database migrated from JSON to {self.db_name}')
+
+    @classmethod
+    def _get_accounts_queries(cls, modules_db: dict):
+        queries = []
+        for encoded_pk, account in modules_db.items():
+            queries.append((
+                "INSERT OR REPLACE INTO accounts (encoded_pk, sol_address, label, proxy) VALUES (?, ?, ?, ?)",
+                (encoded_pk, account["sol_address"], account["label"], account.get("proxy"))
+            ))
+            queries += [
+                ("INSERT INTO modules (encoded_pk, module_name, status) VALUES (?, ?, ?)",
+                 (encoded_pk, module["module_name"], module["status"]))
+                for module in account["modules"]
+            ]
+        return queries
+
+    def _get_modules_db(self):
+        """Аккаунты и их модули в формате старого modules.json (порядок как при создании)"""
+        rows = self._execute((
+            "SELECT a.encoded_pk, a.sol_address, a.label, a.proxy, m.module_name, m.status "
+            "FROM accounts a LEFT JOIN modules m ON m.encoded_pk = a.encoded_pk "
+            "ORDER BY a.rowid, m.id",
+            ()
+        ), fetch="all")
+
+        modules_db = {}
+        for encoded_pk, sol_address, label, proxy, module_name, status in rows:
+            account = modules_db.setdefault(encoded_pk, {
+                "sol_address": sol_address,
+                "label": label,
+                "modules": [],
+                "proxy": proxy,
+            })
+            if module_name is not None:
+                account["modules"].append({"module_name": module_name, "status": status})
+        return modules_db
+
     def set_password(self):
         if self.personal_key is not None: return
 
@@ -60,10 +212,10 @@ class DataBase:
     def get_password(self):
         if self.personal_key is not None: return
 
-        with open(self.modules_db_name, encoding="utf-8") as f: modules_db = json.load(f)
-        if not modules_db: return
+        test_account = self._execute(("SELECT encoded_pk FROM accounts LIMIT 1", ()), fetch="one")
+        if not test_account: return
 
-        test_pk = list(modules_db.keys())[0]
+        test_pk = test_account[0]
         try:
             temp_key = Fernet(urlsafe_b64encode(md5("@karamelniy dumb shit encrypting".encode()).hexdigest().encode()))
             self.decode_pk(pk=test_pk, key=temp_key)
@@ -209,8 +361,6 @@ class DataBase:
             proxy_without_count = len(proxies) - proxy_with_count
             logger.info(f'[•] Soft | Proxy configuration: {proxy_with_count} accounts with proxy, {proxy_without_count} without proxy')
 
-        with open(self.report_db_name, 'w') as f: f.write('{}')  # clear report db
-
         new_modules = {
             self.encode_pk(sol_pk): {
                 "sol_address": get_sol_address(sol_pk),
@@ -220,7 +370,13 @@ class DataBase:
             }
             for sol_pk, label, proxy in zip(sol_private_keys, labels, proxies)
         }
-        with open(self.modules_db_name, 'w', encoding="utf-8") as f: json.dump(new_modules, f)
+        self._execute(
+            ("DELETE FROM reports", ()),  # clear report db
+            ("DELETE FROM report_rates", ()),
+            ("DELETE FROM modules", ()),
+            ("DELETE FROM accounts", ()),
+            *self._get_accounts_queries(new_modules),
+        )
 
         amounts = self.get_amounts()
         logger.critical(f'Dont Forget To Remove Private Keys from sol_privatekeys.txt!')
@@ -228,99 +384,91 @@ class DataBase:
         logger.info(f'Created Database for {amounts["accs_amount"]} accounts with {amounts["modules_amount"]} modules!\n')
 
     def get_amounts(self):
-        with open(self.modules_db_name, encoding="utf-8") as f: modules_db = json.load(f)
-        modules_len = sum([len(modules_db[acc]["modules"]) for acc in modules_db])
-
-        for acc in modules_db:
-            for index, module in enumerate(modules_db[acc]["modules"]):
-                if module["status"] in ["failed", "in_progress"]: modules_db[acc]["modules"][index]["status"] = "to_run"
-
-        with open(self.modules_db_name, 'w', encoding="utf-8") as f: json.dump(modules_db, f)
-
-        if self.window_name == None: self.window_name = WindowName(accs_amount=len(modules_db))
-        else: self.window_name.accs_amount = len(modules_db)
+        accs_amount, modules_len = self._execute(
+            ("UPDATE modules SET status = 'to_run' WHERE status IN ('failed', 'in_progress')", ()),
+            ("SELECT (SELECT COUNT(*) FROM accounts), (SELECT COUNT(*) FROM modules)", ()),
+            fetch="one"
+        )
+
+        if self.window_name == None: self.window_name = WindowName(accs_amount=accs_amount)
+        else: self.window_name.accs_amount = accs_amount
         self.window_name.set_modules(modules_amount=modules_len)
 
-        return {'accs_amount': len(modules_db), 'modules_amount': modules_len}
+        return {'accs_amount': accs_amount, 'modules_amount': modules_len}
 
 
     async def get_random_module(self):
         async with self.lock:
             self.get_password()
 
-            last = False
-            with open(self.modules_db_name, encoding="utf-8") as f: modules_db = json.load(f)
+            order = "RANDOM()" if SHUFFLE_WALLETS else "a.rowid, m.id"
+            module_row = await self._aexecute((
+                "SELECT m.id, m.encoded_pk, m.module_name, a.proxy FROM modules m "
+                f"JOIN accounts a ON a.encoded_pk = m.encoded_pk WHERE m.status = 'to_run' ORDER BY {order} LIMIT 1",
+                ()
+            ), fetch="one")
+            if not module_row:
+                return 'No more accounts left'
 
-            if (
-                    not modules_db or
-                    [module["status"] for acc in modules_db for module in modules_db[acc]["modules"]].count('to_run') == 0
-            ):
-                    return 'No more accounts left'
-
-            index = 0
-            while True:
-                if index == len(modules_db.keys()) - 1: index = 0
-                if SHUFFLE_WALLETS: sol_privatekey = choice(list(modules_db.keys()))
-                else: sol_privatekey = list(modules_db.keys())[index]
-                module_info = choice(modules_db[sol_privatekey]["modules"])
-                if module_info["status"] not in ["to_run"]:
-                    index += 1
-                    continue
-                module_info["status"] = "in_progress"
-
-                # simulate db
-                for module in modules_db[sol_privatekey]["modules"]:
-                    if module["module_name"] == module_info["module_name"] and module["status"] == module_info["status"]:
-                        module["status"] = "in_progress"
-                        with open(self.modules_db_name, 'w', encoding="utf-8") as f: json.dump(modules_db, f)
-                        break
-
-                if [module["status"] for module in modules_db[sol_privatekey]["modules"]].count('to_run') == 0: # if no modules left for this account
-                    last = True
-
-                return {
-                    'sol_pk': self.decode_pk(pk=sol_privatekey),
-                    'sol_encoded_pk': sol_privatekey,
-                    'proxy': modules_db[sol_privatekey].get("proxy"),
-                    'module_info': module_info,
-                    'last': last
-                }
+            module_id, sol_privatekey, module_name, proxy = module_row
+            modules_left = (await self._aexecute(
+                ("UPDATE modules SET status = 'in_progress' WHERE id = ?", (module_id,)),
+                ("SELECT COUNT(*) FROM modules WHERE encoded_pk = ? AND status = 'to_run'", (sol_privatekey,)),
+                fetch="one"
+            ))[0]
+
+            return {
+                'sol_pk': self.decode_pk(pk=sol_privatekey),
+                'sol_encoded_pk': sol_privatekey,
+                'proxy': proxy,
+                'module_info': {"module_name": module_name, "status": "in_progress"},
+                'last': modules_left == 0  # if no modules left for this account
+            }
 
 
     def get_modules_left(self, encoded_pk: str):
         self.get_password()
-        with open(self.modules_db_name, encoding="utf-8") as f: modules_db = json.load(f)
-        if not modules_db.get(encoded_pk): return 0
-        return len([m for m in modules_db[encoded_pk]["modules"] if m["status"] == "to_run"])
+        return self._execute((
+            "SELECT COUNT(*) FROM modules WHERE encoded_pk = ? AND status = 'to_run'",
+            (encoded_pk,)
+        ), fetch="one")[0]
 
 
     def set_accounts_modules_done(self, new_modules: dict):
-        with open(self.stats_db_name, encoding="utf-8") as f: stats_db = json.load(f)
-        stats_db["modules_done"] = {
-            v["sol_address"]: [0, len(v["modules"])]
+        persistence.submit(self._write_modules_done, {
+            v["sol_address"]: len(v["modules"])
             for k, v in new_modules.items()
-        }
-        with open(self.stats_db_name, 'w', encoding="utf-8") as f: json.dump(stats_db, f)
+        })
+
+    def _write_modules_done(self, items: list):
+        """Handler потока записи: items - [{sol_address: modules amount}, ...], актуален последний"""
+        self._execute(
+            ("DELETE FROM modules_done", ()),
+            *[
+                ("INSERT OR REPLACE INTO modules_done (sol_address, done, total) VALUES (?, ?, ?)", (address, 0, total))
+                for address, total in items[-1].items()
+            ]
+        )
 
 
     def increase_account_modules_done(self, address: str):
-        with open(self.stats_db_name, encoding="utf-8") as f: stats_db = json.load(f)
-        modules_done = stats_db["modules_done"].get(address)
+        modules_done = self._execute(
+            ("UPDATE modules_done SET done = done + 1 WHERE sol_address = ?", (address,)),
+            ("SELECT done, total FROM modules_done WHERE sol_address = ?", (address,)),
+            fetch="one"
+        )
         if modules_done is None:
             return None
-        modules_done[0] += 1
-        if modules_done[0] == modules_done[1]:
-            del stats_db["modules_done"][address]
-        else:
-            stats_db["modules_done"][address] = modules_done
 
-        with open(self.stats_db_name, 'w', encoding="utf-8") as f: json.dump(stats_db, f)
+        modules_done = list(modules_done)
+        if modules_done[0] == modules_done[1]:
+            self._execute(("DELETE FROM modules_done WHERE sol_address = ?", (address,)))
         return modules_done
 
 
     def get_all_modules(self, unique_wallets: bool = False):
         self.get_password()
-        with open(self.modules_db_name, encoding="utf-8") as f: modules_db = json.load(f)
+        modules_db = self._get_modules_db()
 
         if (
                 not modules_db or
@@ -355,61 +503,66 @@ class DataBase:
 
     async def remove_module(self, module_data: dict):
         async with self.lock:
-            with open(self.modules_db_name, encoding="utf-8") as f: modules_db = json.load(f)
-
-            for index, module in enumerate(modules_db[module_data["sol_encoded_pk"]]["modules"]):
-                if module["module_name"] == module_data["module_info"]["module_name"] and module["status"] == "to_run":
-                    self.window_name.add_module()
-
-                    if module_data["module_info"]["status"] in [True, "completed"]:
-                        modules_db[module_data["sol_encoded_pk"]]["modules"].remove(module)
-                    else:
-                        modules_db[module_data["sol_encoded_pk"]]["modules"][index]["status"] = "failed"
-                    break
-
-            if [
-                module["status"]
-                for module in modules_db[module_data["sol_encoded_pk"]]["modules"]
-            ].count('to_run') == 0:
+            encoded_pk = module_data["sol_encoded_pk"]
+            module_row = await self._aexecute((
+                "SELECT id FROM modules WHERE encoded_pk = ? AND module_name = ? AND status = 'to_run' ORDER BY id LIMIT 1",
+                (encoded_pk, module_data["module_info"]["module_name"])
+            ), fetch="one")
+
+            queries = []
+            if module_row:
+                self.window_name.add_module()
+
+                if module_data["module_info"]["status"] in [True, "completed"]:
+                    queries.append(("DELETE FROM modules WHERE id = ?", (module_row[0],)))
+                else:
+                    queries.append(("UPDATE modules SET status = 'failed' WHERE id = ?", (module_row[0],)))
+
+            queries.append((
+                "SELECT COUNT(*), SUM(status = 'to_run') FROM modules WHERE encoded_pk = ?",
+                (encoded_pk,)
+            ))
+            modules_amount, to_run_amount = await self._aexecute(*queries, fetch="one")
+
+            if not to_run_amount:
                 self.window_name.add_acc()
-            if not modules_db[module_data["sol_encoded_pk"]]["modules"]:
-                del modules_db[module_data["sol_encoded_pk"]]
-
-            with open(self.modules_db_name, 'w', encoding="utf-8") as f: json.dump(modules_db, f)
+            if not modules_amount:
+                await self._aexecute(("DELETE FROM accounts WHERE encoded_pk = ?", (encoded_pk,)))
 
     async def remove_account(self, module_data: dict):
         async with self.lock:
-            with open(self.modules_db_name, encoding="utf-8") as f: modules_db = json.load(f)
-
             if module_data["module_info"]["status"] in [True, "completed"]:
-                del modules_db[module_data["sol_encoded_pk"]]
+                await self._aexecute(
+                    ("DELETE FROM modules WHERE encoded_pk = ?", (module_data["sol_encoded_pk"],)),
+                    ("DELETE FROM accounts WHERE encoded_pk = ?", (module_data["sol_encoded_pk"],)),
+                )
                 self.window_name.add_acc()
 
-                with open(self.modules_db_name, 'w', encoding="utf-8") as f: json.dump(modules_db, f)
-
 
     async def append_report(self, key: str, text: str, success: bool = None):
-        async with self.lock:
-            status_smiles = {True: '✅ ', False: "❌ ", None: ""}
-
-            with open(self.report_db_name, encoding="utf-8") as f: report_db = json.load(f)
-
-            if not report_db.get(key): report_db[key] = {'texts': [], 'success_rate': [0, 0]}
-
-            report_db[key]["texts"].append(status_smiles[success] + text)
-            if success != None:
-                report_db[key]["success_rate"][1] += 1
-                if success == True: report_db[key]["success_rate"][0] += 1
-
-            with open(self.report_db_name, 'w') as f: json.dump(report_db, f)
+        status_smiles = {True: '✅ ', False: "❌ ", None: ""}
+        persistence.submit(self._write_reports, (key, status_smiles[success] + text, success))
+
+    def _write_reports(self, items: list):
+        """Handler потока записи: items - [(key, text, success), ...], вся пачка одной транзакцией"""
+        queries = []
+        for key, text, success in items:
+            queries += [
+                ("INSERT INTO reports (encoded_pk, text) VALUES (?, ?)", (key, text)),
+                (
+                    "INSERT INTO report_rates (encoded_pk, success, total) VALUES (?, ?, ?) "
+                    "ON CONFLICT (encoded_pk) DO UPDATE SET success = success + excluded.success, total = total + excluded.total",
+                    (key, int(success == True), int(success != None))
+                ),
+            ]
+        self._execute(*queries)
 
 
     async def get_account_reports(self, sol_encoded_pk: str, mode: int):
+        await persistence.flush()  # отчеты и счетчики сделок пишутся в фоне - дожидаемся их
         async with self.lock:
-            with open(self.report_db_name, encoding="utf-8") as f: report_db = json.load(f)
-
             sol_address = get_sol_address(self.decode_pk(pk=sol_encoded_pk))
-            modules_done = self.increase_account_modules_done(address=sol_address)
+            modules_done = await asyncio.to_thread(self.increase_account_modules_done, address=sol_address)
             header_string = ""
             trade_amount = "\n\n"
             if (
@@ -422,16 +575,67 @@ class DataBase:
                 trade_amount = f"\n📌 [Trade {modules_done[0]}/{modules_done[1]}]\n\n"
             title_text = f"{header_string}<b>{sol_address}</b>{trade_amount}"
 
-            if report_db.get(sol_encoded_pk):
-                account_reports = report_db[sol_encoded_pk]
-                del report_db[sol_encoded_pk]
-                with open(self.report_db_name, 'w', encoding="utf-8") as f: json.dump(report_db, f)
+            texts = await self._aexecute(
+                ("SELECT text FROM reports WHERE encoded_pk = ? ORDER BY id", (sol_encoded_pk,)),
+                fetch="all"
+            )
+            success_rate = await self._aexecute(
+                ("SELECT success, total FROM report_rates WHERE encoded_pk = ?", (sol_encoded_pk,)),
+                fetch="one"
+            ) or (0, 0)
+
+            if texts:
+                await self._aexecute(
+                    ("DELETE FROM reports WHERE encoded_pk = ?", (sol_encoded_pk,)),
+                    ("DELETE FROM report_rates WHERE encoded_pk = ?", (sol_encoded_pk,)),
+                )
 
-                logs_text = '\n'.join(account_reports['texts'])
+                logs_text = '\n'.join(text for text, in texts)
                 tg_text = f'{title_text}{logs_text}'
-                if account_reports["success_rate"][1]:
-                    tg_text += f'\n\nSuccess rate {account_reports["success_rate"][0]}/{account_reports["success_rate"][1]}'
+                if success_rate[1]:
+                    tg_text += f'\n\nSuccess rate {success_rate[0]}/{success_rate[1]}'
                 return tg_text
 
             else:
                 return f'{title_text}No actions'
+
+
+    async def get_privy_session(self, address: str):
+        """Сохраненная сессия Privy кошелька (токены, user id, embedded адреса) или None"""
+        row = await self._aexecute(
+            ("SELECT data FROM privy_sessions WHERE sol_address = ?", (address,)),
+            fetch="one"
+        )
+        if not row:
+            return None
+
+        try:
+            return json.loads(self.decode_pk(pk=row[0]))
+        except InvalidToken:  # зашифрована другим паролем
+            return None
+
+    async def save_privy_session(self, address: str, session: dict):
+        """Сессия хранится зашифрованной тем же ключом, что и приватники"""
+        await self._aexecute((
+            "INSERT OR REPLACE INTO privy_sessions (sol_address, data) VALUES (?, ?)",
+            (address, self.encode_pk(json.dumps(session)))
+        ))
+
+    async def remove_privy_session(self, address: str):
+        await self._aexecute(("DELETE FROM privy_sessions WHERE sol_address = ?", (address,)))
+
+
+    async def get_onboarding_steps(self, address: str):
+        """Одноразовые шаги онбординга (initialize_account, approve_builder_fee, use_ref_code), уже пройденные аккаунтом"""
+        rows = await self._aexecute(
+            ("SELECT step FROM onboarding WHERE sol_address = ?", (address,)),
+            fetch="all"
+        )
+        return {step for step, in rows}
+
+    async def set_onboarding_step(self, address: str, step: str):
+        await self._aexecute(("INSERT OR IGNORE INTO onboarding (sol_address, step) VALUES (?, ?)", (address, step)))
+
+    def reset_onboarding(self):
+        """Принудительная перепроверка: при следующем запуске все шаги онбординга выполнятся заново"""
+        self._execute(("DELETE FROM onboarding", ()))
@@ -0,0 +1,182 @@
+"""
+Оракул priority fee
+===================
+
+get_unit_price ставил фиксированные 100 micro-lamports за compute unit, и при
+загрузке сети транзакции не попадали в ближайшие блоки и уходили в таймаут.
+
+FeeOracle:
+- для каждой срочности (market - маркет ордера, limit - постановка TP, default)
+  запоминает аккаунты, в которые пишут наши транзакции этого типа (включая
+  аккаунты из address lookup tables - там у свапов и Kamino пулы и рынки)
+- в фоне раз в PRIORITY_FEE_REFRESH_INTERVAL секунд запрашивает по ним
+  getRecentPrioritizationFees и держит в памяти комиссии за последние 150 слотов
+- цена compute unit = PRIORITY_FEE_PERCENTILES[срочность]-й перцентиль этих комиссий,
+  в пределах PRIORITY_FEE_MIN..PRIORITY_FEE_MAX
+- запросы идут через свой клиент из rpc_pool (без прокси), а не через клиент
+  кошелька, который освобождается вместе с аккаунтом; close() в конце работы
+"""
+
+from solders.address_lookup_table_account import AddressLookupTable
+from solders.message import MessageV0
+from solders.pubkey import Pubkey
+from loguru import logger
+from json import dumps, loads
+import asyncio
+
+from modules.utils.scheduler import scheduler
+from modules.rpc_pool import rpc_pool
+import settings
+
+
+WINDOW_SLOTS = 150              # RPC хранит комиссии за последние 150 слотов
+MAX_ACCOUNTS = 128              # лимит аккаунтов getRecentPrioritizationFees
+DEFAULT_UNIT_PRICE = 100        # micro-lamports, пока нет данных
+
+
+class RecentPrioritizationFees:
+    """Тело и парсер запроса getRecentPrioritizationFees для provider.make_request (в solders его нет)"""
+
+    def __init__(self, accounts: list):
+        self.accounts = accounts
+
+
+    def to_json(self) -> str:
+        return dumps({"jsonrpc": "2.0", "id": 1, "method": "getRecentPrioritizationFees", "params": [self.accounts]})
+
+
+    @classmethod
+    def from_json(cls, raw: str) -> dict:
+        return loads(raw)
+
+
+class FeeOracle:
+    def __init__(self, interval: float, percentiles: dict, min_price: int, max_price: int):
+        self.interval = interval
+        self.percentiles = percentiles
+        self.min_price = min_price
+        self.max_price = max_price
+
+        self.accounts = {}              # urgency -> {str(pubkey): None} (порядок - последние в конце)
+        self.fees = {}                  # urgency -> {slot: micro-lamports}
+        self.lookup_tables = {}         # str(table) -> [Pubkey, ...] адреса address lookup table
+        self.client = None              # свой AsyncClient из rpc_pool
+
+        self._task = None
+
+
+    async def get_unit_price(self, urgency: str, accounts: list) -> int:
+        """Цена compute unit (micro-lamports) для транзакции, пишущей в accounts"""
+        self.watch(urgency, accounts)
+        if not self.fees.get(urgency):
+            try:
+                await self.refresh(urgency)
+            except Exception as err:
+                logger.debug(f'[-] FeeOracle | Failed to get prioritization fees: {err}')
+        return self.estimate(urgency)
+
+
+    async def get_writable_accounts(self, message: MessageV0, exclude: Pubkey = None) -> list:
+        """Аккаунты, в которые пишет транзакция: статические и из address lookup tables"""
+        accounts = [key for index, key in enumerate(message.account_keys) if message.is_maybe_writable(index)]
+        for lookup in message.address_table_lookups:
+            if not lookup.writable_indexes:
+                continue
+            try:
+                addresses = await self._get_lookup_table(lookup.account_key, max(lookup.writable_indexes))
+            except Exception as err:
+                logger.debug(f'[-] FeeOracle | Failed to load lookup table {lookup.account_key}: {err}')
+                continue
+            accounts += [addresses[index] for index in lookup.writable_indexes]
+
+        return [account for account in accounts if account != exclude]
+
+
+    def watch(self, urgency: str, accounts: list):
+        watched = self.accounts.setdefault(urgency, {})
+        for account in map(str, accounts):
+            watched.pop(account, None)
+            watched[account] = None
+        for account in list(watched)[:-MAX_ACCOUNTS]:
+            del watched[account]
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+
+    def estimate(self, urgency: str = "default") -> int:
+        """Цена compute unit по уже собранным комиссиям (без запросов к RPC)"""
+        table = self.fees.get(urgency) or {
+            slot: fee for urgency_fees in self.fees.values() for slot, fee in urgency_fees.items()
+        }
+        fees = sorted(table.values())
+        if not fees:
+            return DEFAULT_UNIT_PRICE
+
+        percent = self.percentiles.get(urgency, self.percentiles["default"])
+        fee = fees[min(int(len(fees) * percent / 100), len(fees) - 1)]
+        return min(max(fee, self.min_price), self.max_price)
+
+
+    async def close(self):
+        """Освобождает клиент (в конце работы event loop-а)"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.client is not None:
+            await rpc_pool.release(self.client)
+            self.client = None
+
+
+    def _get_client(self):
+        if self.client is None:
+            self.client = rpc_pool.acquire(endpoints=settings.RPCS["solana"], proxy=None)
+        return self.client
+
+
+    async def _get_lookup_table(self, table: Pubkey, max_index: int) -> list:
+        """Адреса lookup table (кэш; таблицы только дописываются, перечитываем если индекса еще нет)"""
+        addresses = self.lookup_tables.get(str(table))
+        if addresses is None or len(addresses) <= max_index:
+            account = (await self._get_client().get_account_info(table)).value
+            if account is None:
+                raise Exception('account not found')
+            addresses = self.lookup_tables[str(table)] = list(AddressLookupTable.deserialize(bytes(account.data)).addresses)
+            if len(addresses) <= max_index:
+                raise Exception(f'index {max_index} out of range')
+        return addresses
+
+
+    async def refresh(self, urgency: str):
+        # через провайдер пула: роутинг по RPC и лимит одновременных запросов
+        result = await self._get_client()._provider.make_request(
+            RecentPrioritizationFees(list(self.accounts.get(urgency, {}))),
+            RecentPrioritizationFees,
+        )
+        if "result" not in result:
+            raise Exception(f'Unexpected getRecentPrioritizationFees response: {result}')
+
+        table = self.fees.setdefault(urgency, {})
+        for sample in result["result"]:
+            table[sample["slot"]] = sample["prioritizationFee"]
+        if table:
+            last_slot = max(table)
+            for slot in [slot for slot in table if slot <= last_slot - WINDOW_SLOTS]:
+                del table[slot]
+
+
+    async def _run(self):
+        while await scheduler.sleep(self.interval):
+            for urgency in list(self.accounts):
+                try:
+                    await self.refresh(urgency)
+                except Exception as err:
+                    logger.debug(f'[-] FeeOracle | Failed to refresh {urgency} prioritization fees: {err}')
+
+
+fee_oracle = FeeOracle(
+    interval=settings.PRIORITY_FEE_REFRESH_INTERVAL,
+    percentiles=settings.PRIORITY_FEE_PERCENTILES,
+    min_price=settings.PRIORITY_FEE_MIN,
+    max_price=settings.PRIORITY_FEE_MAX,
+)
@@ -0,0 +1,105 @@
+"""
+Фоновая запись на диск
+======================
+
+Статистика (StatsStore), отчеты (DataBase.append_report) и счетчики сделок
+(DataBase.set_accounts_modules_done) писались прямо из async кода - пока диск
+занят, стоят все аккаунты, и время исполнения сделки зависело от того,
+как долго сериализуется книга Excel.
+
+PersistenceWorker - одна очередь и один поток записи:
+- submit(handler, item)  - кладет запись в очередь и сразу возвращается (можно звать из event loop)
+- поток копит записи до PERSIST_FLUSH_INTERVAL секунд и отдает каждому handler-у
+  все его записи одной пачкой: handler(items)
+- flush() / flush_sync() - дождаться пока все поставленные записи окажутся на диске
+  (перед чтением отчетов и при завершении работы)
+- если handler упал, пачка повторяется до write_retries раз; потерянные записи
+  выводятся в лог целиком (уровень ERROR)
+"""
+
+from threading import Thread, Event, Lock
+from queue import Queue, Empty
+from loguru import logger
+from time import time, sleep
+import asyncio
+
+import settings
+
+
+class PersistenceWorker:
+    def __init__(self, flush_interval: float, max_batch: int = 500, write_retries: int = 3):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.write_retries = write_retries
+
+        self.queue = Queue()            # (handler, item); handler None - маркер flush (item = Event)
+        self._thread = None
+        self._start_lock = Lock()       # submit зовут и из event loop, и из to_thread
+
+
+    def submit(self, handler, item):
+        """Ставит запись в очередь; handler будет вызван в потоке записи со списком записей"""
+        self.queue.put((handler, item))
+        self._start()
+
+
+    def flush_sync(self, timeout: float = None):
+        """Блокирующе ждет пока все записи, поставленные до вызова, будут записаны"""
+        done = Event()
+        self.queue.put((None, done))
+        self._start()
+        return done.wait(timeout)
+
+
+    async def flush(self, timeout: float = None):
+        return await asyncio.to_thread(self.flush_sync, timeout)
+
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, name="persistence", daemon=True)
+                self._thread.start()
+
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time() + self.flush_interval
+
+            # копим пачку, пока не вышло время или не попросили flush
+            while batch[-1][0] is not None and len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get(timeout=max(deadline - time(), 0)))
+                except Empty:
+                    break
+
+            self._write(batch)
+
+
+    def _write(self, batch: list):
+        groups = {}
+        flushed = []
+        for handler, item in batch:
+            if handler is None:
+                flushed.append(item)
+            else:
+                groups.setdefault(handler, []).append(item)
+
+        for handler, items in groups.items():
+            for attempt in range(1, self.write_retries + 1):
+                try:
+                    handler(items)
+                    break
+                except Exception as err:
+                    if attempt < self.write_retries:
+                        logger.warning(f'[-] Persistence | Failed to write {len(items)} records: {err} [{attempt}/{self.write_retries}]')
+                        sleep(1)
+                    else:
+                        logger.error(f'[-] Persistence | Lost {len(items)} records after {self.write_retries} attempts ({err}): {items}')
+
+        for done in flushed:
+            done.set()
+
+
+persistence = PersistenceWorker(flush_interval=settings.PERSIST_FLUSH_INTERVAL)
@@ -0,0 +1,159 @@
+"""
+Общий фид цен для всех аккаунтов
+================================
+
+Раньше каждый аккаунт сам ходил в Pricing API каждые 10 секунд, и при 50 кошельках
+одна и та же цена WBTC запрашивалась 50 раз за тик (и у каждого была немного своя).
+
+PriceFeed опрашивает все нужные активы одним запросом multi_price за тик, хранит последнее значение
+с меткой времени и раздает его всем стратегиям:
+- get_price(token)  - последняя цена (если устарела - обновляется перед ответом)
+- add_trigger(token, below, above) - событие, которое сработает когда новая цена
+  выйдет за уровни (стратегия спит до пересечения вместо опроса по таймеру)
+
+Запросы идут через сессию (и прокси) одного из аккаунтов; если она не отвечает,
+аккаунт уходит в конец списка и запрос повторяется через следующий.
+"""
+
+from loguru import logger
+from time import time
+import asyncio
+
+import settings
+
+
+class PriceFeed:
+    def __init__(self, interval: float, max_age: float):
+        self.interval = interval                # как часто опрашиваем цены (сек)
+        self.max_age = max_age                  # сколько секунд цена считается актуальной
+
+        self.prices = {}                        # token -> {"price": float, "timestamp": float}
+        self.tokens = set(settings.PRICE_WATCH_TOKENS)  # какие активы опрашиваем
+        self.triggers = {}                      # token -> [{"below", "above", "event"}, ...]
+        self.browsers = []                      # через чьи сессии (и прокси) ходим в API
+
+        self.lock = asyncio.Lock()
+        self._task = None
+
+
+    def attach(self, browser):
+        """Добавляет Browser аккаунта как источник запросов"""
+        if browser is not None and browser not in self.browsers:
+            self.browsers.append(browser)
+
+
+    def watch(self, token: str):
+        """Добавляет актив в список опрашиваемых и запускает фоновый опрос"""
+        self.tokens.add(token)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+
+    def add_trigger(self, token: str, below: float = None, above: float = None) -> asyncio.Event:
+        """
+        Регистрирует уровни актива. Событие выставляется на первой новой цене
+        ниже below или выше above (None - уровень не отслеживается)
+        """
+        self.watch(token)
+        trigger = {"below": below, "above": above, "event": asyncio.Event()}
+        self.triggers.setdefault(token, []).append(trigger)
+        return trigger["event"]
+
+
+    def remove_trigger(self, token: str, event: asyncio.Event):
+        self.triggers[token] = [trigger for trigger in self.triggers.get(token, []) if trigger["event"] is not event]
+
+
+    def get_cached(self, token: str):
+        """Возвращает последнюю цену если она не старше max_age, иначе None"""
+        quote = self.prices.get(token)
+        if quote and time() - quote["timestamp"] <= self.max_age:
+            return quote["price"]
+        return None
+
+
+    async def get_price(self, token: str, browser=None) -> float:
+        """
+        Возвращает актуальную цену актива.
+        Если кэш устарел - обновляет все активы одним проходом (только один аккаунт,
+        остальные ждут на локе и забирают уже свежее значение).
+        """
+        self.attach(browser)
+        self.watch(token)
+
+        price = self.get_cached(token)
+        if price is not None:
+            return price
+
+        async with self.lock:
+            price = self.get_cached(token)
+            if price is None:
+                await self.refresh()
+                price = self.get_cached(token)
+
+        if price is None:
+            raise Exception(f'No fresh price for {token}')
+        return price
+
+
+    async def refresh(self):
+        """Один тик: все активы одним запросом multi_price, результат раздаем стратегиям"""
+        browsers = self._get_browsers()
+        if not browsers:
+            raise Exception('No active sessions to request prices')
+
+        tokens = sorted(self.tokens)
+        for browser in browsers:
+            try:
+                prices = await browser.get_multi_price(tokens)
+                break
+            except Exception as err:
+                # прокси аккаунта не отвечает - отправляем его в конец, пробуем следующий
+                logger.debug(f'[-] PriceFeed | Request via {browser.sol_address} failed: {err}')
+                if browser in self.browsers:
+                    self.browsers.remove(browser)
+                    self.browsers.append(browser)
+        else:
+            raise Exception(f'Prices request failed via all {len(browsers)} sessions')
+
+        for token, price in prices.items():
+            self._publish(token, price)
+
+        missed = [token for token in tokens if token not in prices]
+        if missed:
+            logger.debug(f'[-] PriceFeed | No price for {", ".join(missed)}')
+
+
+    def _publish(self, token: str, price: float):
+        self.prices[token] = {"price": price, "timestamp": time()}
+
+        for trigger in self.triggers.get(token, []):
+            if (
+                    (trigger["below"] is not None and price < trigger["below"]) or
+                    (trigger["above"] is not None and price > trigger["above"])
+            ):
+                trigger["event"].set()
+
+
+    def _get_browsers(self):
+        # сессии закрываются когда аккаунт завершает работу - такие выкидываем
+        self.browsers = [browser for browser in self.browsers if not browser.session.closed]
+        return list(self.browsers)
+
+
+    async def _run(self):
+        while True:
+            try:
+                if self._get_browsers():
+                    async with self.lock:
+                        await self.refresh()
+            except Exception as err:
+                logger.debug(f'[-] PriceFeed | Refresh failed: {err}')
+
+            await asyncio.sleep(self.interval)
+
+
+price_feed = PriceFeed(
+    interval=settings.PRICE_FEED_INTERVAL,
+    max_age=settings.PRICE_MAX_AGE,
+)
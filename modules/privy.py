@@ -8,7 +8,9 @@ from hashlib import sha256
 from loguru import logger
 from uuid import uuid4
 from os import urandom
+from time import time
 import asyncio
+import json
 
 from .sol_wallet import SolWallet
 
@@ -120,6 +122,30 @@ class Privy:
         return result
 
 
+    async def refresh_session(self, session: dict):
+        """
+        Обновляет сохраненную сессию (результат login) через refresh token без повторной подписи.
+        Возвращает данные в том же формате, что и login
+        """
+        tokens_resp = await self.privy_update_session(
+            refresh_token=session["tokens"]["refresh_token"],
+            headers={"Authorization": "Bearer " + session["tokens"]["privy_access_token"]}
+        )
+        self.headers["Authorization"] = "Bearer " + tokens_resp["token"]
+
+        return {
+            **session,
+            "tokens": {
+                "privy_access_token": tokens_resp.get("privy_access_token") or tokens_resp["token"],
+                "refresh_token": tokens_resp.get("refresh_token") or session["tokens"]["refresh_token"],
+                "identity_token": tokens_resp.get("identity_token"),
+                "token": self.headers["Authorization"],
+                "raw": tokens_resp["token"],
+            },
+            "user_id": tokens_resp["user"]["id"],
+        }
+
+
     async def privy_connect_wallet(self, account: Keypair, main_account: bool, captcha_type: str | None = None):
         sign_nonce = await self.privy_init(
             address=str(account.pubkey()),
@@ -395,6 +421,20 @@ class Privy:
             raise Exception(f'Privy Get recovery device unexpected response: {resp}')
 
 
+def get_token_expiry(token: str) -> float:
+    """Время истечения JWT токена (exp из payload), 0 если разобрать не удалось"""
+    try:
+        payload = token.split(".")[1]
+        return float(json.loads(b64decode(payload + "=" * (-len(payload) % 4), altchars=b"-_"))["exp"])
+    except Exception:
+        return 0
+
+
+def is_token_fresh(token: str, margin: float) -> bool:
+    """Токен будет жить еще хотя бы margin секунд"""
+    return get_token_expiry(token) - time() > margin
+
+
 n: list = list(bytes.fromhex(
     "00ffc8089110d0365a3ed8439977fe1823200770a16c0c7f628b4046c74be00eeb16e8adcfcd39536a273593d44e48c32b79542809780f"
     "219087142aa99cd674b47cdeedb18676a498e2968f02321cc133eeef81fd305c139d2917c411448c80f373421e1db5f012d15b41a2d72c"
@@ -0,0 +1,82 @@
+"""
+Фоновое обновление токенов Privy
+================================
+
+Токены Privy из Ranger.privy_login использовались один раз, и если сессия истекала
+посреди работы стратегии, аккаунт падал с ошибкой и проходил медленный перезапуск.
+
+PrivyTokenManager следит за сроком жизни токенов всех работающих аккаунтов и заранее
+(за PRIVY_TOKEN_REFRESH_MARGIN секунд до истечения) обновляет их через
+Privy.refresh_session. Свежий токен сразу кладется в cookies сессии Browser
+(set_privy_token) и в зашифрованный кэш сессий в БД.
+
+Токен нужен только эндпоинтам www.app.ranger.finance (онбординг, реферал,
+approve builder fee) и входу при следующем запуске без полного логина.
+Запросы торговой стратегии к spot API (*.run.app) авторизации Privy не требуют,
+поэтому на торговлю фоновое обновление не влияет.
+"""
+
+from loguru import logger
+import asyncio
+
+from modules.utils.scheduler import scheduler
+from modules.privy import is_token_fresh
+import settings
+
+
+class PrivyTokenManager:
+    def __init__(self, margin: float, check_interval: float = 30):
+        self.margin = margin
+        self.check_interval = check_interval
+
+        self.sessions = {}              # address -> {"privy", "browser", "db", "data"}
+        self._task = None
+
+
+    def track(self, privy, browser, db, session: dict):
+        """Начинает следить за сессией аккаунта (session - результат Privy.login / refresh_session)"""
+        address = str(privy.sol_wallet.address)
+        self.sessions[address] = {"privy": privy, "browser": browser, "db": db, "data": session}
+        browser.set_privy_token(session["tokens"]["raw"])
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+
+    async def untrack(self, sol_wallet):
+        entry = self.sessions.pop(str(sol_wallet.address), None)
+        if entry is not None:
+            try:
+                await entry["privy"].session.close()
+            except Exception:
+                pass
+
+
+    async def _run(self):
+        while self.sessions:
+            for address, entry in list(self.sessions.items()):
+                if not is_token_fresh(entry["data"]["tokens"]["raw"], margin=self.margin):
+                    await self._refresh(address, entry)
+
+            if not await scheduler.sleep(self.check_interval):
+                return
+
+
+    async def _refresh(self, address: str, entry: dict):
+        try:
+            session = await entry["privy"].refresh_session(entry["data"])
+        except Exception as err:
+            logger.warning(f'[-] PrivyTokens | {address} | Failed to refresh Privy session: {err}')
+            return
+
+        if address not in self.sessions:  # аккаунт завершился пока шел запрос
+            return
+
+        entry["data"] = session
+        entry["browser"].set_privy_token(session["tokens"]["raw"])
+        if settings.PRIVY_SESSION_CACHE:
+            await entry["db"].save_privy_session(address, session)
+        logger.debug(f'[•] PrivyTokens | {address} | Privy session refreshed')
+
+
+privy_tokens = PrivyTokenManager(margin=settings.PRIVY_TOKEN_REFRESH_MARGIN)
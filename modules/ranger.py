@@ -1,8 +1,10 @@
 from loguru import logger
 
 from .sol_wallet import SolWallet
-from .privy import Privy
+from .privy import Privy, is_token_fresh
+from .privy_tokens import privy_tokens
 from settings import TRADING_ASSET
+import settings
 
 
 class Ranger:
@@ -20,16 +22,21 @@ class Ranger:
 
     async def start(self, mode: int):
         self.mode = mode
-        await self.privy_login()
 
-        if mode == 2:
-            return await self.averaging_strategy()
+        try:
+            await self.privy_login()
 
-        return True
+            if mode == 2:
+                return await self.averaging_strategy()
+
+            return True
+
+        finally:
+            await privy_tokens.untrack(self.sol_wallet)
 
 
     async def privy_login(self):
-        privy_data = await Privy(
+        privy = Privy(
             sol_wallet=self.sol_wallet,
             url="www.app.ranger.finance",
             headers={
@@ -37,34 +44,79 @@ class Ranger:
                 "Privy-Client": "react-auth:2.21.1",
             },
             privy_url="auth.privy.io"
-        ).login(embedded_sol_wallet=True, embedded_eth_wallet=True)
+        )
+        privy_data = await self.get_privy_session(privy)
 
         await self.browser.fetch_ranger_cookies()
-        privy_cookies = {
-            "privy-session": "t",
-            "privy-token": privy_data["tokens"]["raw"],
-        }
-
-        await self.browser.initialize_ranger_account(
-            user_id=privy_data["user_id"],
-            privy_cookies=privy_cookies,
-        )
+        # токен обновляется в фоне до истечения и подставляется в cookies Browser
+        privy_tokens.track(privy=privy, browser=self.browser, db=self.db, session=privy_data)
 
-        approve_quote = await self.browser.get_approve_builder_fee_quote(privy_eth_address=privy_data["embedded_eth_address"])
-        await self.browser.approve_builder_fee(
-            quote=approve_quote,
-            privy_cookies=privy_cookies,
-        )
+        await self.onboard_account(privy_data=privy_data, privy_cookies=self.browser.privy_cookies)
 
-        ref_signature = self.sol_wallet.sign_message(
-            text="Sign this message to verify your ownership of this wallet and accept the referral.",
-            raw=True,
-        )
-        await self.browser.use_ref_code(
-            signature=ref_signature,
-            user_id=privy_data["user_id"],
-            privy_cookies=privy_cookies,
-        )
+
+    async def onboard_account(self, privy_data: dict, privy_cookies: dict):
+        """
+        Одноразовые шаги аккаунта. Пройденные шаги запоминаются в БД и при следующих
+        запусках пропускаются (перепроверить - "Reset onboarding state" в меню)
+        """
+        address = str(self.sol_wallet.address)
+        done_steps = await self.db.get_onboarding_steps(address)
+
+        if "initialize_account" not in done_steps:
+            if await self.browser.initialize_ranger_account(
+                user_id=privy_data["user_id"],
+                privy_cookies=privy_cookies,
+            ):
+                await self.db.set_onboarding_step(address, "initialize_account")
+
+        if "approve_builder_fee" not in done_steps:
+            approve_quote = await self.browser.get_approve_builder_fee_quote(privy_eth_address=privy_data["embedded_eth_address"])
+            await self.browser.approve_builder_fee(
+                quote=approve_quote,
+                privy_cookies=privy_cookies,
+            )
+            await self.db.set_onboarding_step(address, "approve_builder_fee")
+
+        if "use_ref_code" not in done_steps:
+            ref_signature = self.sol_wallet.sign_message(
+                text="Sign this message to verify your ownership of this wallet and accept the referral.",
+                raw=True,
+            )
+            if await self.browser.use_ref_code(
+                signature=ref_signature,
+                user_id=privy_data["user_id"],
+                privy_cookies=privy_cookies,
+            ):
+                await self.db.set_onboarding_step(address, "use_ref_code")
+
+
+    async def get_privy_session(self, privy: Privy):
+        """
+        Сессия Privy из зашифрованного кэша в БД вместо полного логина:
+        - токен живет еще PRIVY_TOKEN_REFRESH_MARGIN секунд - используем как есть (0 запросов)
+        - иначе обновляем через refresh token (privy_update_session, 1 запрос)
+        - кэша нет или обновить не удалось - полный логин
+        """
+        address = str(self.sol_wallet.address)
+        cached = await self.db.get_privy_session(address) if settings.PRIVY_SESSION_CACHE else None
+
+        if cached:
+            if is_token_fresh(cached["tokens"]["raw"], margin=settings.PRIVY_TOKEN_REFRESH_MARGIN):
+                self.log_message("Privy session restored from cache")
+                return cached
+
+            try:
+                privy_data = await privy.refresh_session(cached)
+                await self.db.save_privy_session(address, privy_data)
+                self.log_message("Privy session refreshed")
+                return privy_data
+            except Exception as err:
+                self.log_message(f"Failed to refresh cached Privy session, logging in again: {err}", level="WARNING")
+
+        privy_data = await privy.login(embedded_sol_wallet=True, embedded_eth_wallet=True)
+        if settings.PRIVY_SESSION_CACHE:
+            await self.db.save_privy_session(address, privy_data)
+        return privy_data
 
 
     async def averaging_strategy(self):
@@ -3,6 +3,7 @@ from loguru import logger
 from time import sleep
 import asyncio
 
+from modules.utils.scheduler import scheduler
 from settings import RETRY
 
 from requests.exceptions import JSONDecodeError as json_error1
@@ -71,7 +72,7 @@ def async_retry(
                         if to_raise: raise ValueError(f'{custom_module_str}: {e}')
                         else: return False
 
-                    await asyncio.sleep(sleep_on_error)
+                    await scheduler.sleep(sleep_on_error, interruptible=False)
         return newfn
     return decorator
 
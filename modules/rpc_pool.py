@@ -0,0 +1,245 @@
+"""
+Общие клиенты Solana RPC
+========================
+
+Каждый SolWallet создавал свой AsyncClient со своим пулом HTTP соединений,
+и при сотнях кошельков на одном RPC это сотни сокетов и TLS рукопожатий.
+
+RpcClientPool выдает один keep-alive AsyncClient на пару (endpoints, proxy):
+- acquire(endpoints, proxy) - общий клиент, счетчик ссылок +1
+- release(client)           - счетчик -1, последний освободивший закрывает клиент
+- одновременных запросов к одному RPC не больше RPC_MAX_CONCURRENCY,
+  остальные ждут своей очереди вместо того чтобы упираться в лимиты RPC
+
+Если в RPCS['solana'] указано несколько RPC, запросы клиента идут через RpcRouter:
+- по каждому RPC постоянно считаются задержки и ошибки (по реальным запросам)
+- запрос идет на самый быстрый живой RPC
+- если ответа нет дольше RPC_HEDGE_PERCENTILE-го перцентиля задержек этого RPC,
+  тот же запрос параллельно уходит на следующий RPC, берется первый ответ
+- при ошибке запрос сразу повторяется на следующем RPC, а RPC с частыми ошибками
+  на RPC_COOLDOWN секунд уходит в конец очереди
+"""
+
+from solana.rpc.providers.async_http import AsyncHTTPProvider
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.core import RPCException
+from collections import deque
+from time import monotonic
+import asyncio
+
+import settings
+
+
+def get_endpoints(rpcs: str | list) -> list:
+    """RPCS['solana'] может быть строкой или списком RPC"""
+    return [rpcs] if isinstance(rpcs, str) else list(rpcs)
+
+
+class EndpointStats:
+    def __init__(self, window: int = 100):
+        self.latencies = deque(maxlen=window)   # секунды успешных запросов
+        self.results = deque(maxlen=20)         # True - успех, False - ошибка
+        self.down_until = 0
+
+
+    def record(self, latency: float | None):
+        """latency None - запрос завершился ошибкой"""
+        if latency is not None:
+            self.latencies.append(latency)
+        self.results.append(latency is not None)
+
+        if len(self.results) >= 3 and self.results.count(False) / len(self.results) >= 0.5:
+            self.down_until = monotonic() + settings.RPC_COOLDOWN
+            self.results.clear()
+
+
+    @property
+    def healthy(self) -> bool:
+        return monotonic() >= self.down_until
+
+
+    def percentile(self, percent: float) -> float:
+        if not self.latencies:
+            return 0
+        latencies = sorted(self.latencies)
+        return latencies[min(int(len(latencies) * percent / 100), len(latencies) - 1)]
+
+
+class BoundedProvider:
+    """Обертка над провайдером AsyncClient, ограничивающая число одновременных запросов"""
+
+    def __init__(self, provider, semaphore: asyncio.Semaphore):
+        self.provider = provider
+        self.semaphore = semaphore
+
+
+    async def make_request(self, *args, **kwargs):
+        async with self.semaphore:
+            return await self.provider.make_request(*args, **kwargs)
+
+
+    async def make_batch_request(self, *args, **kwargs):
+        async with self.semaphore:
+            return await self.provider.make_batch_request(*args, **kwargs)
+
+
+    def __getattr__(self, name):
+        return getattr(self.provider, name)
+
+
+class RpcRouter:
+    """Провайдер AsyncClient поверх нескольких RPC: выбор быстрейшего, hedging и failover"""
+
+    def __init__(self, providers: dict, stats: dict):
+        self.providers = providers      # endpoint -> BoundedProvider
+        self.stats = stats              # endpoint -> EndpointStats (общие для всех клиентов пула)
+
+
+    def rank(self) -> list:
+        """Живые RPC по возрастанию медианной задержки (без замеров - первыми), затем упавшие"""
+        return sorted(
+            self.providers,
+            key=lambda endpoint: (not self.stats[endpoint].healthy, self.stats[endpoint].percentile(50))
+        )
+
+
+    async def make_request(self, body, parser):
+        return await self._route(lambda provider: provider.make_request(body, parser), hedge=True)
+
+
+    async def make_batch_request(self, reqs, parsers):
+        return await self._route(lambda provider: provider.make_batch_request(reqs, parsers), hedge=False)
+
+
+    async def close(self):
+        for provider in self.providers.values():
+            await provider.close()
+
+
+    async def _call(self, endpoint: str, request):
+        started = monotonic()
+        try:
+            result = await request(self.providers[endpoint])
+        except asyncio.CancelledError:
+            # проиграл hedge-гонку: время ожидания - нижняя граница задержки RPC.
+            # Учитываем ее если она хуже медианы, иначе тормозящий RPC так и остался бы первым
+            elapsed = monotonic() - started
+            if elapsed > self.stats[endpoint].percentile(50):
+                self.stats[endpoint].record(elapsed)
+            raise
+        except RPCException:  # RPC ответил ошибкой самого запроса - не проблема RPC
+            raise
+        except Exception:
+            self.stats[endpoint].record(None)
+            raise
+        self.stats[endpoint].record(monotonic() - started)
+        return result
+
+
+    async def _route(self, request, hedge: bool):
+        candidates = iter(self.rank())
+        primary = next(candidates)
+        hedge_delay = max(self.stats[primary].percentile(settings.RPC_HEDGE_PERCENTILE), settings.RPC_HEDGE_MIN_DELAY)
+
+        pending = {asyncio.create_task(self._call(primary, request))}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=hedge_delay if hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:  # медленный ответ - дублируем запрос на следующий RPC
+                    hedge = False
+                    endpoint = next(candidates, None)
+                    if endpoint is not None:
+                        pending.add(asyncio.create_task(self._call(endpoint, request)))
+                    continue
+
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    if isinstance(task.exception(), RPCException):  # ошибка самого запроса - на другом RPC будет та же
+                        raise task.exception()
+                    error = task.exception()
+
+                if not pending:  # все запросы упали - failover на следующий RPC
+                    endpoint = next(candidates, None)
+                    if endpoint is not None:
+                        pending.add(asyncio.create_task(self._call(endpoint, request)))
+
+            raise error
+
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+    def __getattr__(self, name):
+        return getattr(self.providers[self.rank()[0]], name)
+
+
+def get_providers(client: AsyncClient) -> list:
+    """Провайдеры всех RPC клиента (для рассылки транзакции сразу на все RPC)"""
+    provider = client._provider
+    return list(provider.providers.values()) if isinstance(provider, RpcRouter) else [provider]
+
+
+class RpcClientPool:
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+
+        self.clients = {}               # (endpoints, proxy) -> AsyncClient
+        self.refs = {}                  # (endpoints, proxy) -> сколько кошельков используют клиент
+        self.stats = {}                 # endpoint -> EndpointStats
+        self.semaphores = {}            # (endpoint, proxy) -> Semaphore
+
+
+    def acquire(self, endpoints: str | list, proxy: str | None) -> AsyncClient:
+        endpoints = tuple(get_endpoints(endpoints))
+        key = (endpoints, proxy)
+        if key not in self.clients:
+            client = AsyncClient(endpoint=endpoints[0], proxy=proxy)
+            if len(endpoints) == 1:
+                client._provider = self._bound(endpoints[0], proxy, client._provider)
+            else:
+                # провайдер первого RPC уже создан клиентом - используем его, а не создаем второй
+                client._provider = RpcRouter(
+                    providers={
+                        endpoint: self._bound(
+                            endpoint,
+                            proxy,
+                            client._provider if endpoint == endpoints[0] else AsyncHTTPProvider(endpoint=endpoint, proxy=proxy)
+                        )
+                        for endpoint in endpoints
+                    },
+                    stats={endpoint: self.stats.setdefault(endpoint, EndpointStats()) for endpoint in endpoints},
+                )
+            self.clients[key] = client
+            self.refs[key] = 0
+
+        self.refs[key] += 1
+        return self.clients[key]
+
+
+    async def release(self, client: AsyncClient):
+        key = next((key for key, pooled in self.clients.items() if pooled is client), None)
+        if key is None:  # клиент не из пула - закрываем сразу
+            await client.close()
+            return
+
+        self.refs[key] -= 1
+        if self.refs[key] <= 0:
+            del self.clients[key]
+            del self.refs[key]
+            await client.close()
+
+
+    def _bound(self, endpoint: str, proxy: str | None, provider) -> BoundedProvider:
+        semaphore = self.semaphores.setdefault((endpoint, proxy), asyncio.Semaphore(self.max_concurrency))
+        return BoundedProvider(provider, semaphore)
+
+
+rpc_pool = RpcClientPool(max_concurrency=settings.RPC_MAX_CONCURRENCY)
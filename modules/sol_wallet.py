@@ -3,6 +3,8 @@ from solders.transaction import Transaction, VersionedTransaction
 from solders.token.associated import get_associated_token_address
 from solders.system_program import transfer, TransferParams
 from solders.message import Message, MessageV0, to_bytes_versioned
+from solders.instruction import CompiledInstruction
+from solders.compute_budget import ID as COMPUTE_BUDGET_ID
 from solders.signature import Signature
 from solders.keypair import Keypair
 from solders.pubkey import Pubkey
@@ -11,9 +13,8 @@ from spl.token.instructions import (
     transfer_checked,
     TransferCheckedParams,
 )
-from solana.rpc.types import TxOpts
 from solana.rpc.async_api import AsyncClient
-from solana.rpc.commitment import Confirmed, Processed
+from solana.rpc.commitment import Confirmed
 from base58 import b58encode, b58decode
 from random import uniform, randint
 from loguru import logger
@@ -25,13 +26,25 @@ import asyncio
 from modules.config import SOL_TOKEN_ADDRESSES, TOKEN_PROGRAMS, CHAINS_DATA, TOKENS_PROGRAM
 from modules.retry import async_retry, CustomError
 from modules.utils import async_sleep, round_cut
+from modules.balance_feed import balance_feed
+from modules.tx_confirmer import tx_confirmer
+from modules.tx_broadcaster import tx_broadcaster
+from modules.blockhash_cache import blockhash_cache
+from modules.fee_oracle import fee_oracle
+from modules.rpc_pool import rpc_pool
 from modules.database import DataBase
-from settings import RPCS, TO_WAIT_TX
+from settings import RPCS, TO_WAIT_TX, PRIORITY_FEE_DYNAMIC, TX_SIMULATION_MODE
 
-from solana.rpc.core import RPCException
+from solana.rpc.core import RPCException, TransactionExpiredBlockheightExceededError
 from solana.exceptions import SolanaRpcException
 
 
+SIMULATION_MODES = ["before", "concurrent", "on_retry"]
+if TX_SIMULATION_MODE not in SIMULATION_MODES:
+    # опечатка в настройке молча отключила бы симуляцию
+    raise ValueError(f'TX_SIMULATION_MODE must be one of {SIMULATION_MODES}, got "{TX_SIMULATION_MODE}"')
+
+
 class SolWallet:
     def __init__(
             self,
@@ -55,11 +68,14 @@ class SolWallet:
         elif type(recipient) == Pubkey:
             self.recipient = recipient
 
-        self.client = client or AsyncClient(endpoint=RPCS["solana"], proxy=self.browser.proxy)
+        # клиент общий для всех кошельков с тем же RPC и прокси (освобождается через rpc_pool.release)
+        self.client = client or rpc_pool.acquire(endpoints=RPCS["solana"], proxy=self.browser.proxy)
 
         self.account = Keypair.from_base58_string(privatekey)
         self.address = self.account.pubkey()
 
+        self.simulate_next = False      # TX_SIMULATION_MODE "on_retry": после фейла следующая транзакция симулируется
+
 
     @property
     def pkey(self):
@@ -131,10 +147,80 @@ class SolWallet:
         return logs[-1]
 
 
+    def _get_rpc_error_text(self, err: RPCException):
+        if hasattr(err.args[0], 'data') and err.args[0].data.logs:
+            error_text = self._get_error_reason(err.args[0].data.logs)
+
+        elif hasattr(err.args[0], 'logs') and err.args[0].logs:
+            error_text = self._get_error_reason(err.args[0].logs)
+
+        elif hasattr(err.args[0], 'message') and err.args[0].message:
+            error_text = err.args[0].message
+
+        elif hasattr(err.args[0], 'err') and err.args[0].err:
+            error_text = str(err.args[0].err)
+
+        else:
+            error_text = str(err)
+
+        if search(r'consumed \d+ of \d+ compute units', error_text):
+            error_text = "not enough funds to send transaction"
+        return error_text
+
+
+    async def _simulate(self, tx):
+        simulated = await self.client.simulate_transaction(txn=tx, commitment=Confirmed)
+        if not hasattr(simulated, "value"):
+            raise RPCException(simulated)
+        elif simulated.value.err:
+            raise RPCException(simulated.value)
+
+
+    def _get_simulation_error(self, simulation: asyncio.Task | None):
+        """Причина ошибки из параллельной симуляции (None - не запускалась, не закончилась или успешна)"""
+        if simulation is None or not simulation.done() or simulation.cancelled():
+            return None
+        if isinstance(simulation.exception(), RPCException):
+            return self._get_rpc_error_text(simulation.exception())
+        return None
+
+
+    def _get_token_changes(self, tx_meta: dict, owner: Pubkey = None):
+        """
+        Изменения SPL балансов владельца по мете транзакции (postTokenBalances - preTokenBalances)
+
+        :return: {mint: {"amount", "value", "decimals"}}
+        """
+        owner = str(owner or self.address)
+        changes = {}
+        for balances_key, sign in [("preTokenBalances", -1), ("postTokenBalances", 1)]:
+            for token_balance in tx_meta.get(balances_key) or []:
+                if token_balance.get("owner") != owner:
+                    continue
+                change = changes.setdefault(token_balance["mint"], {
+                    "value": 0,
+                    "decimals": token_balance["uiTokenAmount"]["decimals"],
+                })
+                change["value"] += sign * int(token_balance["uiTokenAmount"]["amount"])
+
+        for change in changes.values():
+            change["amount"] = change["value"] / 10 ** change["decimals"]
+        return changes
+
+
     async def get_tx_status(self, signature: Signature):
         started = time()
         retry_count = 0
-        
+
+        # ждем подтверждения через signatureSubscribe (+ резервный опрос статусов)
+        try:
+            await tx_confirmer.confirm(client=self.client, signature=signature, timeout=60 * TO_WAIT_TX)
+        except asyncio.TimeoutError:
+            raise Exception(f'tx not in blockchain in {TO_WAIT_TX}m')
+        except TransactionExpiredBlockheightExceededError:
+            return {"success": False, "msg": "blockhash expired before tx was confirmed", "token_changes": {}}
+
+        # транзакция подтверждена - забираем ее мету (логи для причины ошибки)
         while True:
             tx = None
             try:
@@ -168,13 +254,13 @@ class SolWallet:
 
             if time() - started > 60 * TO_WAIT_TX:
                 raise Exception(f'tx not in blockchain in {TO_WAIT_TX}m')
-            await async_sleep(2)
+            await asyncio.sleep(0.5)
 
         tx_result = loads(tx.value.transaction.meta.to_json())
         status = tx_result["err"] is None and "Ok" in tx_result["status"]
 
         reason = self._get_error_reason(tx_result["logMessages"])
-        return {"success": status, "msg": reason}
+        return {"success": status, "msg": reason, "token_changes": self._get_token_changes(tx_result)}
 
 
     def get_associated_token(self, token: str, address: Pubkey):
@@ -187,11 +273,48 @@ class SolWallet:
         )
 
 
-    def get_unit_price(self, amount: float = 0):
-        if not amount: amount = 0.0001 # 100 micro-lamports
+    def get_unit_price(self, amount: float = 0, urgency: str = "default"):
+        if not amount:
+            unit_price = fee_oracle.estimate(urgency) if PRIORITY_FEE_DYNAMIC else 100 # micro-lamports
+            return set_compute_unit_price(unit_price)
         return set_compute_unit_price(int(amount * 1e6))
 
 
+    async def _apply_priority_fee(self, message: MessageV0, urgency: str):
+        """
+        Поднимает цену compute unit в готовой транзакции (от API Ranger) до оценки fee_oracle.
+        Транзакции с чужими подписями не трогаем - изменение сообщения их бы сломало
+        """
+        if message.header.num_required_signatures != 1:
+            return message
+
+        accounts = await fee_oracle.get_writable_accounts(message, exclude=self.address)
+        unit_price = await fee_oracle.get_unit_price(urgency, accounts)
+
+        instructions = list(message.instructions)
+        for index, instruction in enumerate(instructions):
+            if (
+                    message.account_keys[instruction.program_id_index] == COMPUTE_BUDGET_ID and
+                    instruction.data[:1] == bytes([3])  # SetComputeUnitPrice
+            ):
+                if int.from_bytes(instruction.data[1:9], "little") >= unit_price:
+                    return message
+                instructions[index] = CompiledInstruction(
+                    instruction.program_id_index,
+                    bytes(set_compute_unit_price(unit_price).data),
+                    instruction.accounts,
+                )
+                return MessageV0(
+                    message.header,
+                    message.account_keys,
+                    message.recent_blockhash,
+                    instructions,
+                    message.address_table_lookups,
+                )
+
+        return message
+
+
     def get_unit_limit(self, amount: float):
         return set_compute_unit_limit(amount)
 
@@ -242,8 +365,13 @@ class SolWallet:
         token = token or "SOL"
         logger.debug(f'[•] {self.label} | Waiting for balance more than {round_cut(previous_balance_amount, 6)} {token}')
         while True:
+            # со стримом балансов новое значение приходит пушем - не опрашиваем RPC
+            streaming = address == self.address and balance_feed.is_streaming(self, token)
             try:
-                new_balance = await self.get_token_info(address=address, token=token)
+                if streaming:
+                    new_balance = await balance_feed.get_token_info(self, token)
+                else:
+                    new_balance = await self.get_token_info(address=address, token=token)
                 if (
                         new_balance["amount"] > previous_balance_amount or
                         (is_any_difference and new_balance["amount"] != previous_balance_amount)
@@ -252,7 +380,10 @@ class SolWallet:
                     return new_balance
             except SolanaRpcException as e:
                 logger.warning(f'[-] {self.label} | Get {token} balance | {e}')
-            finally:
+
+            if streaming:
+                await balance_feed.wait_for_update(timeout=3)
+            else:
                 await async_sleep(3)
 
 
@@ -266,13 +397,26 @@ class SolWallet:
             signers: list[Keypair] = [],
             tx_debug: bool = True,
             simulate: bool = True,
+            return_status: bool = False,
+            priority: str = None,
     ):
+        """
+        priority: срочность для подбора priority fee (market | limit | default),
+                  None - оставить комиссию транзакции как есть
+        simulate: симулировать транзакцию (как именно - TX_SIMULATION_MODE)
+        """
+        last_valid_block_height = None  # известна только для blockhash из нашего кэша
         if completed_tx_message:
+            if priority and PRIORITY_FEE_DYNAMIC and type(completed_tx_message) == MessageV0:
+                completed_tx_message = await self._apply_priority_fee(completed_tx_message, priority)
+
             if str(completed_tx_message.recent_blockhash) == "11111111111111111111111111111111" and type(completed_tx_message) == MessageV0:
+                latest_blockhash = await blockhash_cache.get()
+                last_valid_block_height = latest_blockhash.last_valid_block_height
                 completed_tx_message = MessageV0(
                     completed_tx_message.header,
                     completed_tx_message.account_keys,
-                    (await self.client.get_latest_blockhash("confirmed")).value.blockhash,
+                    latest_blockhash.blockhash,
                     completed_tx_message.instructions,
                     completed_tx_message.address_table_lookups
                 )
@@ -288,58 +432,44 @@ class SolWallet:
             tx = VersionedTransaction.populate(completed_tx_message, completed_signatures)
 
         elif message:
+            latest_blockhash = await blockhash_cache.get()
+            last_valid_block_height = latest_blockhash.last_valid_block_height
             tx = Transaction(
                 from_keypairs=[self.account, *signers],
                 message=message,
-                recent_blockhash=(await self.client.get_latest_blockhash("confirmed")).value.blockhash,
+                recent_blockhash=latest_blockhash.blockhash,
             )
         elif completed_tx:
             tx = completed_tx
 
-        try:
-            if simulate:
-                simulated = await self.client.simulate_transaction(txn=tx, commitment=Confirmed)
-                if not hasattr(simulated, "value"):
-                    raise RPCException(simulated)
-                elif simulated.value.err:
-                    raise RPCException(simulated.value)
-
-            tx_hash_ = await self.client.send_raw_transaction(
-                txn=bytes(tx),
-                opts=TxOpts(
-                    skip_preflight=True,
-                    preflight_commitment=Processed,
-                )
-            )
-            tx_hash = tx_hash_.value
-
-        except RPCException as err:
-            if hasattr(err.args[0], 'data') and err.args[0].data.logs:
-                error_text = self._get_error_reason(err.args[0].data.logs)
-
-            elif hasattr(err.args[0], 'logs') and err.args[0].logs:
-                error_text = self._get_error_reason(err.args[0].logs)
-
-            elif hasattr(err.args[0], 'message') and err.args[0].message:
-                error_text = err.args[0].message
-
-            elif hasattr(err.args[0], 'err') and err.args[0].err:
-                error_text = str(err.args[0].err)
+        simulation_mode = TX_SIMULATION_MODE if simulate else None
+        if simulation_mode == "on_retry":
+            simulation_mode = "before" if self.simulate_next else None
 
-            else:
-                error_text = str(err)
+        simulation = None
+        stage = "Simulate"
+        try:
+            if simulation_mode == "before":
+                await self._simulate(tx)
+            elif simulation_mode == "concurrent":
+                # симуляция идет параллельно с отправкой и нужна только для понятной причины ошибки
+                simulation = asyncio.create_task(self._simulate(tx))
+                simulation.add_done_callback(lambda task: task.cancelled() or task.exception())
 
-            if search(r'consumed \d+ of \d+ compute units', error_text):
-                error_text = "not enough funds to send transaction"
+            # сразу на все RPC, дальше повторная рассылка до подтверждения или истечения blockhash
+            stage = "Send"
+            tx_hash = await tx_broadcaster.send(self.client, bytes(tx))
 
+        except RPCException as err:
             tx_link = ''
-            tx_status = {"success": False, "msg": f"Simulate failed: {error_text}"}
+            tx_status = {"success": False, "msg": f"{stage} failed: {self._get_rpc_error_text(err)}"}
 
         else:
             tx_link = f"{CHAINS_DATA['solana']['explorer']}{tx_hash}"
             if tx_debug: logger.debug(f'[•] {self.label} | {tx_label} tx sent: {tx_link}')
             
             # Пытаемся проверить статус транзакции
+            rebroadcast = tx_broadcaster.rebroadcast(self.client, bytes(tx), tx_hash, last_valid_block_height)
             try:
                 tx_status = await self.get_tx_status(signature=tx_hash)
             except Exception as e:
@@ -348,15 +478,29 @@ class SolWallet:
                 logger.warning(f'[!] {self.label} | {tx_label} - Cannot verify tx status (RPC error), but tx was sent to blockchain!')
                 logger.warning(f'[!] {self.label} | Check tx manually: {tx_link}')
                 tx_status = {"success": True, "msg": f"RPC verification failed, but tx sent: {str(e)[:100]}"}
+            finally:
+                rebroadcast.cancel()
+
+            simulation_error = self._get_simulation_error(simulation)
+            if not tx_status["success"] and simulation_error and simulation_error not in tx_status["msg"]:
+                tx_status["msg"] = f'{tx_status["msg"]} (simulate: {simulation_error})'
+
+        if simulation is not None and not simulation.done():
+            simulation.cancel()
+        if TX_SIMULATION_MODE == "on_retry":
+            self.simulate_next = not tx_status["success"]
 
         if tx_status["success"]:
             logger.info(f'[+] {self.label} | {tx_label} tx successfully sent!')
+            balance_feed.invalidate(self)
             if tx_debug:
                 await self.db.append_report(
                     key=self.encoded_pk,
                     text=tx_label,
                     success=True
                 )
+            if return_status:
+                return {**tx_status, "tx_hash": tx_hash}
             return tx_hash
         else:
             if tx_link: tx_href = f'| <a href="{tx_link}">link 👈</a>'
@@ -373,6 +517,8 @@ class SolWallet:
                 raise Exception(f'Transaction "{tx_label}" failed error: {tx_status["msg"]}{tx_link_str + tx_link}')
             else:
                 logger.error(f'[-] {self.label} | Transaction "{tx_label}" failed error: {tx_status["msg"]}{tx_link_str + tx_link}')
+                if return_status:
+                    return {"token_changes": {}, **tx_status, "tx_hash": tx_hash if tx_link else None}
                 return False
 
 
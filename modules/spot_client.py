@@ -10,7 +10,10 @@ from datetime import datetime
 import asyncio
 
 from .utils import round_cut, async_sleep
+from .config import SOL_TOKEN_ADDRESSES
 from .utils.tg_report import TgReport
+from .balance_feed import balance_feed
+from .price_feed import price_feed
 from .sol_wallet import SolWallet
 from .browser import Browser
 
@@ -52,10 +55,13 @@ class SpotClient:
         
         # TP ордера (синхронизируются с биржей)
         self.tp_orders = []  # Список TP ордеров на бирже
+
+        # Балансы USDC и актива получаем пачкой вместе с остальными кошельками
+        balance_feed.register(sol_wallet, tokens=["USDC", token_name])
         
     async def get_token_balance(self, token: str) -> Decimal:
         """
-        Получает баланс токена в кошельке с retry-логикой и кэшированием
+        Получает баланс токена в кошельке (через общий BalanceFeed) с retry-логикой и кэшированием
         """
         max_attempts = 5
         delay = 1.0  # Начальная задержка 1 секунда
@@ -66,7 +72,7 @@ class SpotClient:
         
         for attempt in range(1, max_attempts + 1):
             try:
-                token_info = await self.sol_wallet.get_token_info(token)
+                token_info = await balance_feed.get_token_info(self.sol_wallet, token)
                 balance = Decimal(str(token_info.get("amount", 0)))
                 
                 # Сохраняем в кэш
@@ -76,7 +82,7 @@ class SpotClient:
             except Exception as e:
                 if attempt < max_attempts:
                     # Не логируем промежуточные ошибки
-                    await asyncio.sleep(delay)
+                    await async_sleep(delay)
                     delay *= 2  # Exponential backoff: 1s → 2s → 4s → 8s → 16s
                 else:
                     # Все попытки провалились
@@ -102,10 +108,10 @@ class SpotClient:
 
     async def get_current_price(self, token: str) -> Decimal:
         """
-        Получает текущую цену токена
+        Получает текущую цену токена из общего фида цен (один запрос на всех)
         """
         try:
-            price = await self.browser.get_token_price(token)
+            price = await price_feed.get_price(token, browser=self.browser)
             return Decimal(str(price))
         except Exception as e:
             logger.error(f'Failed to get price for {token}: {e}')
@@ -198,20 +204,33 @@ class SpotClient:
             from base64 import b64decode
             
             tx = VersionedTransaction.from_bytes(b64decode(quote["transaction"]))
-            old_balance = (await self.sol_wallet.get_token_info(to_token))["amount"]
+            old_balance = to_token_info["amount"]
             
-            await self.sol_wallet.send_transaction(
+            tx_status = await self.sol_wallet.send_transaction(
                 tx_label=f"ranger market order {amount} {from_token} → {amount_out} {to_token}",
                 completed_tx_message=tx.message,
                 signatures=tx.signatures,
+                return_status=True,
+                priority="market",
             )
 
-            new_balance = await self.sol_wallet.wait_for_balance(
-                previous_balance_amount=old_balance,
-                token=to_token,
-            )
+            # Реальные объемы берем из меты подтвержденной транзакции (pre/postTokenBalances)
+            token_changes = tx_status.get("token_changes") or {}
+            received = token_changes.get(SOL_TOKEN_ADDRESSES[to_token])
+            spent = token_changes.get(SOL_TOKEN_ADDRESSES[from_token])
+
+            if received and received["value"] > 0:
+                actual_amount = received["amount"]
+            else:
+                # Меты нет (RPC не ответил) - ждем изменения баланса как раньше
+                new_balance = await self.sol_wallet.wait_for_balance(
+                    previous_balance_amount=old_balance,
+                    token=to_token,
+                )
+                actual_amount = new_balance["amount"] - old_balance
 
-            actual_amount = new_balance["amount"] - old_balance
+            if spent and spent["value"] < 0:
+                amount = Decimal(str(-spent["amount"]))
             
             # Рассчитываем реальную цену исполнения
             # Цена всегда = USDC / Token (цена токена в долларах)
@@ -317,6 +336,7 @@ class SpotClient:
                 tx_label=f"limit order {amount} {from_token} @ ${limit_price:.2f}",
                 completed_tx_message=tx.message,
                 signatures=tx.signatures,
+                priority="limit",
             )
             
             self.log_message(
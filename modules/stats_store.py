@@ -0,0 +1,136 @@
+"""
+Append-only хранилище статистики
+================================
+
+Раньше log_statistics_to_excel на каждую операцию (First Position, Averaging,
+Pyramiding, Set TP, Take Profit) читал весь stat/<label>_stat.xlsx через pandas,
+добавлял одну строку и перезаписывал книгу целиком - синхронно внутри event loop,
+и чем больше файл, тем дольше стояли все аккаунты.
+
+StatsStore:
+- record(label, row)  - ставит строку в очередь PersistenceWorker и сразу возвращается
+- поток записи дописывает накопленные строки в stat/<label>_stat.csv (append, без чтения файла)
+- экспорт в stat/<label>_stat.xlsx (те же колонки) раз в STATS_EXPORT_INTERVAL
+  секунд и при flush() в конце работы; export_excel() - по запросу
+"""
+
+from threading import RLock
+from loguru import logger
+from time import time
+import asyncio
+import csv
+import os
+
+from modules.persistence import persistence
+import settings
+
+
+STATS_COLUMNS = [
+    'Timestamp', 'Account', 'Current Price', 'Operation', 'Token Amount',
+    'Operation Price', 'USDC Balance', 'Token Balance', 'Limit Orders',
+    'Total Value', 'Limit Orders List'
+]
+
+
+class StatsStore:
+    def __init__(self, directory: str, export_interval: float):
+        self.directory = directory
+        self.export_interval = export_interval
+
+        self.dirty = set()              # label-ы с новыми строками, которые еще не выгружены в Excel
+        self.last_export = time()
+        self.lock = RLock()             # запись и экспорт идут и из потока записи, и из flush()
+
+
+    def record(self, label: str, row: dict):
+        """Добавляет строку статистики аккаунта; запись на диск идет в фоне"""
+        persistence.submit(self._write_rows, (label, row))
+
+
+    async def flush(self):
+        """Дописывает все строки из очереди и выгружает измененные файлы в Excel"""
+        await persistence.flush()
+        await asyncio.to_thread(self._export_dirty)
+
+
+    async def export_excel(self, label: str):
+        """Выгружает stat/<label>_stat.csv в stat/<label>_stat.xlsx"""
+        await persistence.flush()
+        await asyncio.to_thread(self._export, label)
+
+
+    def get_csv_path(self, label: str):
+        return os.path.join(self.directory, f"{label}_stat.csv")
+
+
+    def get_excel_path(self, label: str):
+        return os.path.join(self.directory, f"{label}_stat.xlsx")
+
+
+    def _write_rows(self, items: list):
+        """Handler потока записи: items - [(label, row), ...]"""
+        rows = {}
+        for label, row in items:
+            rows.setdefault(label, []).append(row)
+
+        with self.lock:
+            self._append(rows)
+            self.dirty.update(rows)
+
+        if time() - self.last_export >= self.export_interval:
+            self._export_dirty()
+
+
+    def _export_dirty(self):
+        with self.lock:
+            self.last_export = time()
+            for label in list(self.dirty):
+                try:
+                    self._export(label)
+                except Exception as err:  # например xlsx открыт в Excel - повторим при следующей выгрузке
+                    logger.warning(f'[-] Stats | Failed to export {self.get_excel_path(label)}: {err}')
+                    continue
+                self.dirty.discard(label)
+
+
+    def _append(self, rows: dict):
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+        for label, label_rows in rows.items():
+            csv_path = self.get_csv_path(label)
+            if not os.path.exists(csv_path):
+                self._import_excel(label)
+
+            is_new = not os.path.exists(csv_path)
+            with open(csv_path, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=STATS_COLUMNS)
+                if is_new:
+                    writer.writeheader()
+                writer.writerows(label_rows)
+
+
+    def _import_excel(self, label: str):
+        """Одноразово переносит строки из старого xlsx (до перехода на CSV), чтобы экспорт их не потерял"""
+        excel_path = self.get_excel_path(label)
+        if not os.path.exists(excel_path):
+            return
+
+        import pandas as pd
+        pd.read_excel(excel_path).reindex(columns=STATS_COLUMNS).to_csv(self.get_csv_path(label), index=False)
+
+
+    def _export(self, label: str):
+        csv_path = self.get_csv_path(label)
+        if not os.path.exists(csv_path):
+            return
+
+        import pandas as pd
+        with self.lock:
+            pd.read_csv(csv_path).to_excel(self.get_excel_path(label), index=False)
+
+
+stats_store = StatsStore(
+    directory="stat",
+    export_interval=settings.STATS_EXPORT_INTERVAL,
+)
@@ -0,0 +1,118 @@
+"""
+Рассылка транзакций на все RPC
+==============================
+
+send_transaction отправлял транзакцию один раз на один RPC и дальше только ждал
+подтверждения. При загрузке сети транзакция терялась по дороге к лидеру
+и аккаунт ждал TO_WAIT_TX минут до таймаута.
+
+TxBroadcaster:
+- send(client, tx) - отправляет подписанную транзакцию параллельно на все RPC клиента
+  (RPCS['solana']), подпись возвращается от первого принявшего RPC
+- rebroadcast(...) - фоновая задача: каждые TX_REBROADCAST_INTERVAL секунд повторно
+  рассылает ту же транзакцию, пока она не подтверждена (задачу отменяет send_transaction)
+  или пока не истек ее blockhash - тогда ожидание в tx_confirmer сразу завершается
+  ошибкой TransactionExpiredBlockheightExceededError вместо ожидания таймаута
+"""
+
+from solders.rpc.responses import SendTransactionResp
+from solana.rpc.commitment import Processed
+from solana.rpc.types import TxOpts
+from loguru import logger
+from time import time
+import asyncio
+
+from modules.utils.scheduler import scheduler
+from modules.blockhash_cache import blockhash_cache
+from modules.tx_confirmer import tx_confirmer
+from modules.rpc_pool import get_providers
+import settings
+
+
+MAX_PROCESSING_AGE = 150        # blockhash действителен 150 блоков: last_valid_block_height = высота + 150
+
+
+class TxBroadcaster:
+    def __init__(self, interval: float):
+        self.interval = interval
+
+
+    async def send(self, client, tx: bytes):
+        """
+        Отправляет транзакцию на все RPC клиента, возвращает подпись от первого принявшего.
+        Если не принял ни один RPC - бросает ошибку последнего (RPCException / SolanaRpcException)
+        """
+        body = self._get_body(client, tx)
+        tasks = [asyncio.create_task(self._send_one(client, provider, body)) for provider in get_providers(client)]
+        for task in tasks:  # остальные RPC дорабатывают в фоне, их ошибки не нужны
+            task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+        error = None
+        for task in asyncio.as_completed(tasks):
+            try:
+                return await task
+            except Exception as err:
+                error = err
+        raise error
+
+
+    def rebroadcast(self, client, tx: bytes, signature, last_valid_block_height: int | None) -> asyncio.Task:
+        """
+        Запускает повторную рассылку транзакции. Задачу нужно отменить после подтверждения.
+        last_valid_block_height None - blockhash не наш (транзакция от API), рассылаем до отмены
+        """
+        return asyncio.create_task(self._rebroadcast(client, tx, signature, last_valid_block_height))
+
+
+    async def _rebroadcast(self, client, tx: bytes, signature, last_valid_block_height: int | None):
+        body = self._get_body(client, tx)
+        # не прерывается при завершении работы: отправленная транзакция должна дойти
+        while await scheduler.sleep(self.interval, interruptible=False):
+            if last_valid_block_height and self._is_expired(last_valid_block_height):
+                await self._expire(client, signature)
+                return
+
+            await asyncio.gather(
+                *[self._send_one(client, provider, body) for provider in get_providers(client)],
+                return_exceptions=True,
+            )
+
+
+    @classmethod
+    def _is_expired(cls, last_valid_block_height: int):
+        """Текущую высоту берем из общего кэша blockhash (без лишнего RPC запроса)"""
+        latest = blockhash_cache.value
+        if latest is None or time() - blockhash_cache.updated > blockhash_cache.max_age:
+            return False
+        return latest.last_valid_block_height - MAX_PROCESSING_AGE > last_valid_block_height
+
+
+    @classmethod
+    async def _expire(cls, client, signature):
+        # транзакция могла попасть в последний действительный блок - проверяем статус перед тем как сдаться
+        try:
+            status = (await client.get_signature_statuses([signature])).value[0]
+        except Exception as err:
+            logger.debug(f'[-] TxBroadcaster | Get status of expired tx {signature}: {err}')
+            return
+
+        if status is None:
+            tx_confirmer.expire(signature)
+
+
+    @classmethod
+    def _get_body(cls, client, tx: bytes):
+        # max_retries=0: RPC не пересылает транзакцию сам, этим занимается rebroadcast
+        return client._send_raw_transaction_body(
+            tx,
+            TxOpts(skip_preflight=True, preflight_commitment=Processed, max_retries=0),
+        )
+
+
+    @classmethod
+    async def _send_one(cls, client, provider, body):
+        resp = await provider.make_request(body, SendTransactionResp)
+        return client._post_send(resp).value
+
+
+tx_broadcaster = TxBroadcaster(interval=settings.TX_REBROADCAST_INTERVAL)
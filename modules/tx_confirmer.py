@@ -0,0 +1,190 @@
+"""
+Подтверждение транзакций через signatureSubscribe
+=================================================
+
+Раньше get_tx_status опрашивал get_transaction каждые 2-3 секунды, поэтому между
+подтверждением покупки в сети и постановкой TP проходило несколько лишних секунд.
+
+TxConfirmer держит одно WebSocket соединение на все аккаунты и оформляет
+signatureSubscribe на каждую отправленную транзакцию - нода присылает уведомление
+сразу как только транзакция подтверждена. Параллельно идет резервный опрос
+getSignatureStatuses (на случай если WebSocket недоступен или уведомление потерялось).
+
+Опрос общий для всех аккаунтов: все транзакции в ожидании проверяются одним
+запросом getSignatureStatuses (до 256 подписей) раз в TX_CONFIRM_POLL_INTERVAL,
+а не отдельным циклом на каждую транзакцию.
+
+WebSocket соединение не закрывается сразу после последней транзакции, а держится еще
+TX_CONFIRM_WS_IDLE_TIMEOUT секунд - редкие транзакции не платят за новое подключение.
+"""
+
+from solders.rpc.responses import SignatureNotification, SubscriptionResult
+from solders.transaction_status import TransactionConfirmationStatus
+from solana.rpc.websocket_api import connect
+from solana.rpc.core import TransactionExpiredBlockheightExceededError
+from solana.rpc.commitment import Confirmed
+from solana.exceptions import SolanaRpcException
+from loguru import logger
+from time import monotonic
+import asyncio
+
+import settings
+
+
+CONFIRMED_STATUSES = [TransactionConfirmationStatus.Confirmed, TransactionConfirmationStatus.Finalized]
+STATUSES_CHUNK = 256            # лимит getSignatureStatuses на один запрос
+
+
+class TxConfirmer:
+    def __init__(self, ws_endpoint: str | None, poll_interval: float, idle_timeout: float, reconnect_delay: float = 5):
+        self.ws_endpoint = ws_endpoint
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.reconnect_delay = reconnect_delay
+        self.last_active = 0            # когда в последний раз была транзакция в ожидании
+
+        self.futures = {}               # str(signature) -> Future с ошибкой транзакции (None = успех)
+        self.signatures = {}            # str(signature) -> Signature
+        self.clients = {}               # str(signature) -> AsyncClient аккаунта (для опроса)
+        self.pending = {}               # request id -> str(signature)
+        self.subscriptions = {}         # subscription id -> str(signature)
+        self.subscribed = set()
+
+        self._task = None
+        self._poller = None
+
+
+    async def confirm(self, client, signature, timeout: float):
+        """
+        Ждет подтверждения транзакции (commitment confirmed).
+        Возвращает ошибку транзакции из статуса (None если успешна),
+        при превышении timeout бросает asyncio.TimeoutError,
+        если истек blockhash (expire) - TransactionExpiredBlockheightExceededError
+        """
+        key = str(signature)
+        self.last_active = monotonic()
+        future = self.futures.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self.futures[key] = future
+            self.signatures[key] = signature
+            self.clients[key] = client
+
+        if self.ws_endpoint and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll())
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+        finally:
+            self._forget(key)
+
+
+    def expire(self, signature):
+        """blockhash транзакции истек - она уже не попадет в блок, ожидание завершается ошибкой"""
+        future = self.futures.get(str(signature))
+        if future is not None and not future.done():
+            future.set_exception(TransactionExpiredBlockheightExceededError(f'{signature} has expired: block height exceeded'))
+
+
+    def _resolve(self, key: str, err):
+        future = self.futures.get(key)
+        if future is not None and not future.done():
+            future.set_result(err)
+
+
+    def _forget(self, key: str):
+        self.last_active = monotonic()
+        self.futures.pop(key, None)
+        self.signatures.pop(key, None)
+        self.clients.pop(key, None)
+        self.subscribed.discard(key)
+        for mapping in [self.pending, self.subscriptions]:
+            for request_id in [request_id for request_id, value in mapping.items() if value == key]:
+                del mapping[request_id]
+
+
+    def _is_connection_needed(self):
+        """Есть транзакции в ожидании или с последней прошло меньше idle_timeout"""
+        return bool(self.futures) or monotonic() - self.last_active < self.idle_timeout
+
+
+    async def _poll(self):
+        """Резервный опрос: все ожидающие транзакции всех аккаунтов пачками getSignatureStatuses"""
+        errors = 0
+        while self.futures:
+            await asyncio.sleep(self.poll_interval)
+
+            keys = [key for key, future in self.futures.items() if not future.done()]
+            if not keys:
+                continue
+            client = self.clients[keys[0]]
+            signatures = [self.signatures[key] for key in keys]
+
+            for index in range(0, len(keys), STATUSES_CHUNK):
+                try:
+                    statuses = (await client.get_signature_statuses(signatures[index:index + STATUSES_CHUNK])).value
+                    errors = 0
+                except Exception as err:  # любая ошибка не должна останавливать опрос для всех аккаунтов
+                    errors += 1
+                    if isinstance(err, SolanaRpcException) and errors % 10:
+                        continue
+                    logger.warning(f'[-] TxConfirmer | Get signature statuses | RPC errors: {errors} attempts ({err})')
+                    continue
+
+                for key, status in zip(keys[index:index + STATUSES_CHUNK], statuses):
+                    if status is not None and status.confirmation_status in CONFIRMED_STATUSES:
+                        self._resolve(key, status.err)
+
+
+    async def _run(self):
+        while self._is_connection_needed():
+            try:
+                async with connect(self.ws_endpoint) as websocket:
+                    await self._listen(websocket)
+
+            except Exception as err:
+                logger.debug(f'[-] TxConfirmer | WebSocket connection lost, polling only: {err}')
+
+            finally:
+                self.pending.clear()
+                self.subscriptions.clear()
+                self.subscribed.clear()
+
+            if self._is_connection_needed():
+                await asyncio.sleep(self.reconnect_delay)
+
+
+    async def _listen(self, websocket):
+        while self._is_connection_needed():
+            for key, signature in list(self.signatures.items()):
+                if key not in self.subscribed and key not in self.pending.values():
+                    await websocket.signature_subscribe(signature, commitment=Confirmed)
+                    # request_counter - itertools.count, id отправленного запроса - последний ключ sent_subscriptions
+                    self.pending[max(websocket.sent_subscriptions)] = key
+
+            try:
+                messages = await asyncio.wait_for(websocket.recv(), timeout=1)
+            except asyncio.TimeoutError:
+                continue
+
+            for message in messages:
+                if isinstance(message, SubscriptionResult):
+                    key = self.pending.pop(message.id, None)
+                    if key:
+                        self.subscriptions[message.result] = key
+                        self.subscribed.add(key)
+
+                elif isinstance(message, SignatureNotification):
+                    # после уведомления нода сама снимает подписку
+                    key = self.subscriptions.pop(message.subscription, None)
+                    if key:
+                        self._resolve(key, message.result.value.err)
+
+
+tx_confirmer = TxConfirmer(
+    ws_endpoint=settings.RPCS.get("solana_ws") if settings.TX_CONFIRM_STREAMING else None,
+    poll_interval=settings.TX_CONFIRM_POLL_INTERVAL,
+    idle_timeout=settings.TX_CONFIRM_WS_IDLE_TIMEOUT,
+)
@@ -14,3 +14,5 @@ from .utils import (
 from .window_name import WindowName
 from .modes import choose_mode
 from .tg_report import TgReport
+from .tg_notifier import tg_notifier
+from .scheduler import scheduler
@@ -48,6 +48,7 @@ def choose_mode():
         modes=[
             Mode(soft_id=2, type="module", text=f"Averaging/Pyramiding Strategy"),
             Mode(soft_id=0, type="", text="(Re)Create Database", is_numeric=False),
+            Mode(soft_id=102, type="onboarding", text="Reset onboarding state (re-check builder fee & referral)", is_numeric=False),
         ]
     )
 
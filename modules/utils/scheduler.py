@@ -0,0 +1,65 @@
+"""
+Планировщик ожиданий
+====================
+
+async_sleep раньше делал int(seconds) раз asyncio.sleep(1): async_sleep(0.5) не ждал
+вовсе, любое ожидание округлялось до секунды, а каждая задача просыпалась раз в секунду.
+
+Scheduler:
+- sleep(seconds, jitter) - один таймер на ожидание, точность до долей секунды,
+  jitter добавляет случайные 0..jitter секунд
+- request_shutdown() - общий сигнал завершения: все текущие и будущие прерываемые
+  ожидания (простой стратегии, пауза между аккаунтами) завершаются сразу,
+  sleep возвращает False. Паузы опроса и повторов (interruptible=False) спят
+  как обычно, чтобы текущие операции доработали без холостого цикла
+"""
+
+from random import uniform
+import asyncio
+
+
+class Scheduler:
+    def __init__(self):
+        self.shutdown_requested = False
+        self.waiters = set()            # Future-ы текущих ожиданий
+
+
+    async def sleep(self, seconds: float, jitter: float = 0, interruptible: bool = True) -> bool:
+        """Ждет seconds (+ до jitter) секунд. False - ожидание прервано завершением работы"""
+        delay = seconds + (uniform(0, jitter) if jitter else 0)
+        if not interruptible:
+            await asyncio.sleep(max(delay, 0))
+            return True
+        if self.shutdown_requested:
+            return False
+        if delay <= 0:
+            await asyncio.sleep(0)
+            return not self.shutdown_requested
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        timer = loop.call_later(delay, self._wake, waiter)
+        self.waiters.add(waiter)
+        try:
+            await waiter
+        finally:
+            timer.cancel()
+            self.waiters.discard(waiter)
+
+        return not self.shutdown_requested
+
+
+    def request_shutdown(self):
+        """Прерывает все ожидания (можно вызывать из обработчика сигнала)"""
+        self.shutdown_requested = True
+        for waiter in list(self.waiters):
+            waiter.get_loop().call_soon_threadsafe(self._wake, waiter)
+
+
+    @classmethod
+    def _wake(cls, waiter: asyncio.Future):
+        if not waiter.done():
+            waiter.set_result(None)
+
+
+scheduler = Scheduler()
@@ -0,0 +1,258 @@
+"""
+Сервис отправки уведомлений в Telegram
+======================================
+
+Раньше TgReport.send_log, send_warning_notification и send_profit_notification
+на каждое сообщение заново читали input_data/tg_bot_tokens.txt, открывали новый
+ClientSession и по очереди слали всем пользователям - прямо внутри торгового цикла.
+
+TgNotifier:
+- токены читаются один раз, одна долгоживущая сессия на все сообщения
+- send(text) только кладет сообщение в ограниченную очередь чата и сразу возвращается
+- у каждого чата свой воркер: чаты получают сообщения параллельно, внутри чата - по порядку
+- лимиты Telegram соблюдаются token bucket-ами: TG_CHAT_RATE сообщений/сек на чат
+  и TG_BOT_RATE сообщений/сек на бота
+- на 429 ждем retry_after из ответа и повторяем отправку
+- обычные сообщения, пришедшие в течение TG_DIGEST_WINDOW секунд, склеиваются
+  в один дайджест на чат (с разбиением по лимиту Telegram 4096 символов),
+  критичные (critical=True) уходят сразу
+"""
+
+from aiohttp import ClientSession
+from loguru import logger
+from time import monotonic
+import asyncio
+
+from .utils import _load_tg_tokens
+import settings
+
+
+MESSAGE_LIMIT = 4096            # лимит длины текста sendMessage
+DIGEST_SEPARATOR = "\n\n"
+
+
+def split_message(texts: list, limit: int = MESSAGE_LIMIT, separator: str = DIGEST_SEPARATOR):
+    """
+    Склеивает тексты в сообщения не длиннее limit.
+    Границы сообщений по возможности совпадают с границами текстов,
+    текст длиннее limit режется на куски
+    """
+    messages = []
+    current = ""
+    for text in texts:
+        while len(text) > limit:
+            if current:
+                messages.append(current)
+                current = ""
+            messages.append(text[:limit])
+            text = text[limit:]
+        if not text:
+            continue
+
+        if current and len(current) + len(separator) + len(text) <= limit:
+            current += separator + text
+        else:
+            if current:
+                messages.append(current)
+            current = text
+
+    if current:
+        messages.append(current)
+    return messages
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate                # сколько токенов добавляется в секунду
+        self.capacity = capacity        # максимальный burst
+        self.tokens = capacity
+        self.updated = monotonic()
+        self.lock = asyncio.Lock()
+
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+    def pause(self, seconds: float):
+        """Следующий токен появится не раньше чем через seconds (retry_after от Telegram)"""
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+        self.updated = monotonic()
+
+
+class TgNotifier:
+    def __init__(self, queue_size: int, chat_rate: float, bot_rate: float, digest_window: float, max_retries: int = 3):
+        self.queue_size = queue_size
+        self.digest_window = digest_window
+        self.chat_rate = chat_rate
+        self.bot_rate = bot_rate
+        self.max_retries = max_retries
+
+        self.bot_token = ''
+        self.profit_bot_token = ''
+        self.user_ids = []
+        self._loaded = False
+
+        self.queues = {}                # chat_id -> asyncio.Queue[(bot_token, payload)]
+        self.workers = {}               # chat_id -> Task
+        self.chat_buckets = {}          # chat_id -> TokenBucket
+        self.bot_buckets = {}           # bot_token -> TokenBucket
+        self.digests = {}               # (chat_id, bot_token, params) -> [text, ...] ждущие склейки
+        self.digest_tasks = {}          # (chat_id, bot_token, params) -> Task
+        self.session = None
+
+
+    def load_tokens(self):
+        if not self._loaded:
+            self.bot_token, self.profit_bot_token, self.user_ids = _load_tg_tokens()
+            self._loaded = True
+
+
+    def send(self, text: str, bot: str = "main", critical: bool = False, **params) -> bool:
+        """
+        Ставит сообщение в очередь всем пользователям.
+        bot: "main" (TG_BOT_TOKEN) | "profit" (PROFIT_BOT_TOKEN)
+        critical: отправить сразу, минуя склейку в дайджест
+        params: доп. поля sendMessage (disable_web_page_preview и т.д.)
+        Возвращает False если бот не настроен
+        """
+        self.load_tokens()
+        bot_token = self.profit_bot_token if bot == "profit" else self.bot_token
+        if not bot_token or not self.user_ids:
+            return False
+
+        for chat_id in self.user_ids:
+            if critical or not self.digest_window:
+                for message in split_message([text]):
+                    self._put(chat_id, bot_token, {"chat_id": chat_id, "text": message, "parse_mode": "HTML", **params})
+            else:
+                self._add_to_digest((chat_id, bot_token, tuple(sorted(params.items()))), text)
+        return True
+
+
+    async def flush(self, timeout: float = 30):
+        """Отправляет накопленные дайджесты и ждет пока все сообщения из очередей будут отправлены"""
+        for key in list(self.digests):
+            self._release_digest(key)
+        try:
+            await asyncio.wait_for(asyncio.gather(*[queue.join() for queue in self.queues.values()]), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f'[-] TG | Not all notifications were sent in {timeout}s')
+
+
+    async def close(self):
+        """Отправляет оставшиеся сообщения и закрывает сессию (в конце работы event loop-а)"""
+        await self.flush()
+        for task in [*self.workers.values(), *self.digest_tasks.values()]:
+            task.cancel()
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+        self.queues.clear()
+        self.workers.clear()
+        self.digest_tasks.clear()
+        self.chat_buckets.clear()
+        self.bot_buckets.clear()
+        self.session = None
+
+
+    def _add_to_digest(self, key: tuple, text: str):
+        self.digests.setdefault(key, []).append(text)
+
+        task = self.digest_tasks.get(key)
+        if task is None or task.done():
+            self.digest_tasks[key] = asyncio.create_task(self._wait_digest(key))
+
+
+    async def _wait_digest(self, key: tuple):
+        await asyncio.sleep(self.digest_window)
+        self._release_digest(key)
+
+
+    def _release_digest(self, key: tuple):
+        """Склеивает накопленные тексты чата и ставит получившиеся сообщения в очередь отправки"""
+        texts = self.digests.pop(key, [])
+        chat_id, bot_token, params = key
+        for message in split_message(texts):
+            self._put(chat_id, bot_token, {"chat_id": chat_id, "text": message, "parse_mode": "HTML", **dict(params)})
+
+
+    def _put(self, chat_id: int, bot_token: str, payload: dict):
+        queue = self.queues.get(chat_id)
+        if queue is None:
+            queue = self.queues[chat_id] = asyncio.Queue(maxsize=self.queue_size)
+
+        if queue.full():
+            queue.get_nowait()
+            queue.task_done()
+            logger.warning(f'[-] TG | Queue for {chat_id} is full, oldest notification dropped')
+        queue.put_nowait((bot_token, payload))
+
+        worker = self.workers.get(chat_id)
+        if worker is None or worker.done():
+            self.workers[chat_id] = asyncio.create_task(self._deliver(chat_id))
+
+
+    async def _deliver(self, chat_id: int):
+        queue = self.queues[chat_id]
+        while True:
+            bot_token, payload = await queue.get()
+            try:
+                await self._post(chat_id, bot_token, payload)
+            except Exception as err:
+                logger.error(f'[-] TG | Send Telegram message error to {chat_id}: {err}')
+            finally:
+                queue.task_done()
+
+
+    async def _post(self, chat_id: int, bot_token: str, payload: dict):
+        chat_bucket = self.chat_buckets.setdefault(chat_id, TokenBucket(rate=self.chat_rate, capacity=1))
+        bot_bucket = self.bot_buckets.setdefault(bot_token, TokenBucket(rate=self.bot_rate, capacity=self.bot_rate))
+        url = f'https://api.telegram.org/bot{bot_token}/sendMessage'
+
+        for attempt in range(self.max_retries):
+            await chat_bucket.acquire()
+            await bot_bucket.acquire()
+
+            try:
+                async with self._get_session().post(url, json=payload) as response:
+                    result = await response.json(content_type=None)
+            except Exception as err:
+                logger.error(f'[-] TG | Send Telegram message error to {chat_id}: {err}')
+                continue
+
+            if result.get("ok"):
+                return
+
+            retry_after = result.get("parameters", {}).get("retry_after")
+            if retry_after:
+                logger.warning(f'[-] TG | Rate limited for {chat_id}, retry after {retry_after}s')
+                chat_bucket.pause(retry_after)
+                continue
+
+            logger.error(f'Telegram API error to {chat_id}: {result}')
+            return
+
+        logger.error(f'[-] TG | Notification to {chat_id} dropped after {self.max_retries} attempts')
+
+
+    def _get_session(self):
+        if self.session is None or self.session.closed:
+            self.session = ClientSession()
+        return self.session
+
+
+tg_notifier = TgNotifier(
+    queue_size=settings.TG_QUEUE_SIZE,
+    chat_rate=settings.TG_CHAT_RATE,
+    bot_rate=settings.TG_BOT_RATE,
+    digest_window=settings.TG_DIGEST_WINDOW,
+)
@@ -127,9 +127,13 @@ def get_sol_address(pk: str):
     return str(Keypair.from_base58_string(pk).pubkey())
 
 
-async def async_sleep(seconds: int):
-    for _ in range(int(seconds)):
-        await asyncio.sleep(1)
+async def async_sleep(seconds: float, jitter: float = 0, interruptible: bool = False):
+    """
+    Точное ожидание через общий планировщик.
+    interruptible=True - прерывается при завершении работы (вернет False)
+    """
+    from .scheduler import scheduler
+    return await scheduler.sleep(seconds, jitter=jitter, interruptible=interruptible)
 
 
 def _load_tg_tokens():
@@ -173,34 +177,16 @@ async def send_warning_notification(error_type: str, error_message: str, account
     """
     Отправляет уведомление о критической ошибке в Telegram через основного бота (TG_BOT_TOKEN).
     Формат: 🚨 Ranger Bot | [аккаунт] ❌ Ошибка: [тип ошибки] 📝 Описание: [описание ошибки]
+    Сообщение только ставится в очередь TgNotifier - отправка идет в фоне сразу, без склейки в дайджест.
     """
     try:
-        from aiohttp import ClientSession
-        
-        TG_BOT_TOKEN, _, TG_USER_ID = _load_tg_tokens()
-
-        if not TG_BOT_TOKEN or not TG_USER_ID:
-            return
+        from .tg_notifier import tg_notifier
 
         message = f"🚨 Ranger Bot | {account_label}\n"
         message += f"❌ Ошибка: {error_type}\n"
         message += f"📝 Описание: {error_message}"
 
-        async with ClientSession() as session:
-            for user_id in TG_USER_ID:
-                url = f"https://api.telegram.org/bot{TG_BOT_TOKEN}/sendMessage"
-                data = {
-                    "chat_id": user_id,
-                    "text": message,
-                    "parse_mode": "HTML"
-                }
-
-                try:
-                    async with session.post(url, json=data) as response:
-                        if response.status != 200:
-                            logger.error(f"Failed to send warning notification: {response.status}")
-                except Exception as e:
-                    logger.error(f"Failed to send warning to {user_id}: {e}")
+        tg_notifier.send(message, critical=True)
 
     except Exception as e:
         logger.error(f"Failed to send warning notification: {e}")
@@ -217,31 +203,10 @@ async def send_profit_notification(message: str):
         message: Текст сообщения для отправки
     """
     try:
-        from aiohttp import ClientSession
-        
-        _, PROFIT_BOT_TOKEN, TG_USER_ID = _load_tg_tokens()
-
-        if not PROFIT_BOT_TOKEN or not TG_USER_ID:
-            return
+        from .tg_notifier import tg_notifier
 
         # Добавляем префикс "ranger:" к сообщениям для profit bot
-        profit_message = f"🎯 ranger: {message}"
-
-        async with ClientSession() as session:
-            for user_id in TG_USER_ID:
-                url = f"https://api.telegram.org/bot{PROFIT_BOT_TOKEN}/sendMessage"
-                data = {
-                    "chat_id": user_id,
-                    "text": profit_message,
-                    "parse_mode": "HTML"
-                }
-
-                try:
-                    async with session.post(url, json=data) as response:
-                        if response.status != 200:
-                            logger.error(f"Failed to send profit notification: {response.status}")
-                except Exception as e:
-                    logger.error(f"Failed to send profit to {user_id}: {e}")
+        tg_notifier.send(f"🎯 ranger: {message}", bot="profit")
 
     except Exception as e:
         logger.error(f"Failed to send profit notification: {e}")
\ No newline at end of file
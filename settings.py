@@ -19,6 +19,14 @@ SHUFFLE_WALLETS     = True                  # True | False - перемешив
 RETRY               = 3                     # кол-во попыток при ошибках / фейлах
 
 TO_WAIT_TX          = 1                     # сколько минут ожидать транзакцию. если транза будет находится в пендинге после указанного времени то будет считатся зафейленной
+TX_CONFIRM_STREAMING = True                 # True - ждать подтверждения транзакций через WebSocket (signatureSubscribe)
+TX_CONFIRM_POLL_INTERVAL = 2                # резервный опрос getSignatureStatuses (секунды)
+TX_CONFIRM_WS_IDLE_TIMEOUT = 120            # сколько секунд держать WebSocket открытым после последней транзакции
+TX_REBROADCAST_INTERVAL = 2                 # повторно рассылать транзакцию на все RPC каждые N секунд, пока не подтверждена или не истек blockhash
+BLOCKHASH_REFRESH_INTERVAL = 2              # как часто обновлять общий кэш blockhash в фоне (секунды)
+TX_SIMULATION_MODE  = "before"              # "before" - симулировать транзакцию перед отправкой (+1 запрос к RPC перед каждым ордером)
+                                            # "concurrent" - отправлять сразу, симуляция параллельно (только для причины ошибки)
+                                            # "on_retry" - отправлять сразу, симулировать перед отправкой только после неудачной транзакции
 
 # Тестовый режим отключен - фильтр ghost orders работает!
 TEST_MODE           = False                 # Тестовый режим для создания лимитного ордера
@@ -28,7 +36,10 @@ TEST_LIMIT_ORDER_PRICE = 120000            # Фиксированная цена
 ENABLE_TRADING      = True                 # Включить/выключить торговлю (покупки/продажи)
 
 RPCS                = {
-    'solana'    : 'https://api.mainnet-beta.solana.com',  # лучше поменять на рпс с https://www.quicknode.com/
+    'solana'    : [                                       # один RPC или список: запросы идут на самый быстрый, при ошибках - на следующий
+        'https://api.mainnet-beta.solana.com',            # лучше поменять на рпс с https://www.quicknode.com/
+    ],
+    'solana_ws' : 'wss://api.mainnet-beta.solana.com',    # WebSocket того же RPC (подписки на балансы и транзакции)
 }
 
 # --- GENERAL SETTINGS ---
@@ -47,6 +58,61 @@ MIN_ORDER_NOTIONAL      = 5.0              # Минимальная стоимо
 # Настройки логирования стратегии
 LOG_LEVEL               = "INFO"           # DEBUG | INFO | WARNING | ERROR
 ENABLE_EXCEL_STATS      = True             # Сохранять статистику в Excel файл
+STATS_EXPORT_INTERVAL   = 300              # как часто выгружать stat/*_stat.csv в Excel (секунды)
+PERSIST_FLUSH_INTERVAL  = 2                # статистика и отчеты пишутся на диск фоновым потоком пачками раз в N секунд
+
+# --- CONNECTIONS ---
+# HTTP соединения переиспользуются всеми аккаунтами с одинаковым прокси
+HTTP_LIMIT_PER_HOST     = 20               # максимум одновременных соединений к одному хосту через один прокси
+HTTP_KEEPALIVE_TIMEOUT  = 60               # сколько секунд держать простаивающее соединение открытым
+HTTP_DNS_TTL            = 300              # кэш DNS (секунды)
+RPC_MAX_CONCURRENCY     = 20               # максимум одновременных запросов к одному Solana RPC (на прокси)
+RPC_HEDGE_PERCENTILE    = 90               # при нескольких RPC: если ответа нет дольше этого перцентиля задержек - дублировать запрос на следующий RPC
+RPC_HEDGE_MIN_DELAY     = 0.3              # но не раньше чем через N секунд
+RPC_COOLDOWN            = 30               # RPC с частыми ошибками на N секунд уходит в конец очереди
+
+# --- PRIORITY FEES ---
+# Цена compute unit подбирается по недавним комиссиям (getRecentPrioritizationFees) для аккаунтов наших транзакций
+PRIORITY_FEE_DYNAMIC    = True             # False - как раньше, комиссия из транзакции Ranger / 100 micro-lamports
+PRIORITY_FEE_PERCENTILES = {               # какой перцентиль недавних комиссий платить
+    'market'    : 75,                      # маркет ордера (покупки и продажи)
+    'limit'     : 50,                      # постановка TP (лимитные ордера)
+    'default'   : 50,                      # остальные транзакции
+}
+PRIORITY_FEE_MIN        = 100              # micro-lamports за compute unit, не меньше
+PRIORITY_FEE_MAX        = 1_000_000        # и не больше (защита от всплесков комиссий)
+PRIORITY_FEE_REFRESH_INTERVAL = 10         # как часто обновлять комиссии в фоне (секунды)
+
+# --- PRIVY SESSION ---
+PRIVY_SESSION_CACHE     = True             # хранить сессию Privy в БД (зашифрованной) и не логиниться заново при каждом запуске
+PRIVY_TOKEN_REFRESH_MARGIN = 300           # обновлять токен Privy если до истечения осталось меньше N секунд
+
+# --- STRATEGY LOOP ---
+STRATEGY_EVENT_DRIVEN   = True             # True - аккаунт спит до пересечения уровней усреднения/пирамидинга/TP или изменения баланса
+                                           # False - полная проверка каждые 10 секунд
+STRATEGY_RECONCILE_INTERVAL = 60           # полная сверка с биржей не реже чем раз в N секунд (страховка в event-driven режиме)
+                                           # исполнение TP без BALANCE_STREAMING замечается по цене или на этой сверке
+
+# --- PRICE FEED ---
+# Цена опрашивается один раз на актив для всех аккаунтов и раздается стратегиям
+PRICE_FEED_INTERVAL     = 5                # как часто обновлять цены (секунды)
+PRICE_MAX_AGE           = 20               # через сколько секунд цена считается устаревшей
+PRICE_WATCH_TOKENS      = ["USDC", "SOL"]  # какие токены опрашивать вместе с TRADING_ASSET (один запрос multi_price)
+                                           # можно добавить любые символы из SOL_TOKEN_ADDRESSES
+
+# --- BALANCES ---
+# Балансы всех кошельков запрашиваются пачкой (getMultipleAccounts) и кэшируются
+BALANCE_MAX_AGE         = 5                # через сколько секунд баланс считается устаревшим
+BALANCE_STREAMING       = False            # True - получать изменения балансов пушами через WebSocket (accountSubscribe)
+                                           # WebSocket адрес берется из RPCS['solana_ws']
+
+# --- TELEGRAM ---
+# Уведомления отправляются в фоне через одну сессию с учетом лимитов Telegram
+TG_QUEUE_SIZE           = 500              # максимум сообщений в очереди на чат (при переполнении выкидываются самые старые)
+TG_CHAT_RATE            = 1                # сообщений в секунду в один чат
+TG_BOT_RATE             = 25               # сообщений в секунду на бота (лимит Telegram ~30)
+TG_DIGEST_WINDOW        = 3                # сообщения за N секунд склеиваются в одно (0 - отправлять каждое сразу)
+                                           # критичные ошибки отправляются сразу всегда
 
 # --- FALLBACK PRICE SOURCES ---
 # Если основные источники цен недоступны, можно использовать альтернативные